@@ -0,0 +1,66 @@
+"""Microbenchmark of the get_current_user auth dependency with and without the JWT cache
+
+Simulates realistic token reuse: a pool of active users, each sending many
+requests with the same token, in random order. Reports CPU time per request
+and the cache hit rate.
+
+    python -m benchmarks.auth_token_cache --users 200 --requests 50000
+"""
+import argparse
+import random
+import time
+
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt as jose_jwt
+
+from inventory.app.auth import jwt
+from inventory.app.auth.oauth2 import get_current_user
+from inventory.app.config import settings
+
+
+def make_tokens(users: int) -> list:
+    exp = int(time.time()) + settings.JWT_EXPIRE_MINUTES * 60
+    return [
+        HTTPAuthorizationCredentials(
+            scheme="Bearer",
+            credentials=jose_jwt.encode(
+                {"sub": str(user), "role": "USER", "exp": exp}, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM
+            )
+        )
+        for user in range(users)
+    ]
+
+
+def run(sequence: list, cached: bool) -> float:
+    """Return CPU microseconds per get_current_user call"""
+    settings.jwt_cache_enabled = cached
+    jwt.token_cache.clear()
+    start = time.process_time()
+    for credentials in sequence:
+        get_current_user(credentials)
+    return (time.process_time() - start) / len(sequence) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200, help="distinct active tokens")
+    parser.add_argument("--requests", type=int, default=50000)
+    args = parser.parse_args()
+
+    tokens = make_tokens(args.users)
+    sequence = [random.choice(tokens) for _ in range(args.requests)]
+
+    uncached = run(sequence, cached=False)
+    hits_before, misses_before = jwt.token_cache.hits, jwt.token_cache.misses
+    cached = run(sequence, cached=True)
+    hits = jwt.token_cache.hits - hits_before
+    lookups = hits + jwt.token_cache.misses - misses_before
+
+    print(f"{args.requests} requests from {args.users} tokens")
+    print(f"{'uncached':>10}: {uncached:8.1f} us CPU/request")
+    print(f"{'cached':>10}: {cached:8.1f} us CPU/request  (hit rate {hits / lookups:.1%})")
+    print(f"{'saved':>10}: {uncached - cached:8.1f} us CPU/request ({uncached / cached:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Event-to-stock-update latency of the inventory consumer engines
+
+Publishes order_completed events at a steady rate and measures, per event,
+the time from XADD (the stream ID timestamp) to the end of the DB
+transaction that takes the stock, for the sync loop and the asyncio engine
+(``CONSUMER_ENGINE=asyncio``). Needs a running Redis (``docker compose up
+redis``); a throwaway SQLite database and Redis DB index are used.
+
+    python -m benchmarks.consumer_latency --rate 200 --seconds 10
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+# Point the inventory service at a throwaway database before it is imported
+_db_dir = tempfile.mkdtemp(prefix="inventory-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/inventory.db"
+
+import redis  # noqa: E402
+import redis.asyncio  # noqa: E402
+from inventory import consumer  # noqa: E402
+from inventory.app.config import settings  # noqa: E402
+from inventory.app.database import SessionLocal, init_db  # noqa: E402
+from inventory.app.models.product import Product  # noqa: E402
+
+PRODUCTS = 50
+
+
+def clear_dedupe(redis_client) -> None:
+    """Drop the consumer's processed-message keys so every run starts cold"""
+    for key in redis_client.scan_iter(f"{consumer.IDEMPOTENCY_KEY}:*", count=1000):
+        redis_client.delete(key)
+
+
+def seed_products() -> None:
+    """Create products with enough stock that no order is refunded"""
+    db = SessionLocal()
+    try:
+        db.query(Product).delete()
+        db.add_all(Product(id=i, name=f"product-{i}", price=1.0, quantity=10**9) for i in range(1, PRODUCTS + 1))
+        db.commit()
+    finally:
+        db.close()
+
+
+def run(redis_client, engine: str, rate: int, seconds: float) -> list:
+    """Run one consumer worker with the given engine under load; returns latencies in ms"""
+    redis_client.delete(consumer.STREAM_KEY, "refund_order")
+    clear_dedupe(redis_client)
+    redis_client.xgroup_create(name=consumer.STREAM_KEY, groupname=consumer.GROUP, id="0", mkstream=True)
+
+    latencies = []
+    reserve_orders = consumer.reserve_orders
+
+    def timed_reserve_orders(pending):
+        result = reserve_orders(pending)
+        done = time.time()
+        for message_id, _ in pending:
+            latencies.append((done - int(message_id.split("-")[0]) / 1000) * 1000)
+        return result
+
+    consumer.reserve_orders = timed_reserve_orders
+    stop_event = threading.Event()
+    target = consumer.CONSUMER_ENGINES[engine]
+    worker = threading.Thread(target=target, args=(f"bench-{engine}", stop_event))
+    worker.start()
+    time.sleep(1)
+
+    interval = 1 / rate
+    total = int(rate * seconds)
+    next_send = time.perf_counter()
+    for i in range(total):
+        redis_client.xadd(consumer.STREAM_KEY, {"pk": str(i), "product_id": str(i % PRODUCTS + 1), "quantity": "1"})
+        next_send += interval
+        time.sleep(max(next_send - time.perf_counter(), 0))
+
+    deadline = time.monotonic() + 30
+    while len(latencies) < total and time.monotonic() < deadline:
+        time.sleep(0.1)
+    stop_event.set()
+    worker.join()
+    consumer.reserve_orders = reserve_orders
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=int, default=200, help="events per second")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--redis-db", type=int, default=15)
+    args = parser.parse_args()
+
+    consumer.logger.setLevel("WARNING")
+    settings.consumer_reclaim_interval = 3600
+
+    # Workers open their own clients; keep them on the bench DB index
+    consumer.create_redis_client = lambda: redis.Redis(
+        host=settings.redis_host, port=settings.redis_port, password=settings.redis_password,
+        db=args.redis_db, decode_responses=True
+    )
+    consumer.create_async_redis_client = lambda: redis.asyncio.Redis(
+        host=settings.redis_host, port=settings.redis_port, password=settings.redis_password,
+        db=args.redis_db, decode_responses=True
+    )
+
+    init_db()
+    redis_client = consumer.create_redis_client()
+    print(f"{args.rate} events/s for {args.seconds:.0f}s, batch size {settings.consumer_batch_size}")
+    print(f"{'engine':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for engine in ("sync", "asyncio"):
+        seed_products()
+        latencies = sorted(run(redis_client, engine, args.rate, args.seconds))
+        if not latencies:
+            print(f"{engine:>8}: no events processed")
+            continue
+        p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+        print(f"{engine:>8} {statistics.median(latencies):8.1f} {p99:8.1f} {latencies[-1]:8.1f}")
+
+    redis_client.delete(consumer.STREAM_KEY, "refund_order")
+    clear_dedupe(redis_client)
+
+
+if __name__ == "__main__":
+    main()
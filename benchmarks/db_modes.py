@@ -0,0 +1,67 @@
+"""Inventory read throughput with the sync engine vs DATABASE_ASYNC=true
+
+A SQLite catalog is seeded once, then the inventory API is started with
+uvicorn in its own process for each mode (product cache disabled so every
+request reaches the database). GET /products/{id} is loaded at increasing
+concurrency and req/s and p99 latency are reported per mode. Sync mode runs
+each query on the AnyIO threadpool (40 threads by default); async mode awaits
+the aiosqlite/asyncpg driver on the event loop.
+
+    python -m benchmarks.db_modes --requests 3000 --concurrency 10 50 200
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from jose import jwt
+
+from benchmarks.inventory_export_memory import seed_catalog
+from benchmarks.load import _wait_for_port, print_result, run_load
+
+PORT = 8794
+
+
+def measure(db_path: str, database_async: bool, products: int, total: int, concurrency: int) -> dict:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        DATABASE_ASYNC=str(database_async).lower(),
+        PRODUCT_CACHE_ENABLED="false"
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "inventory.app.main:app", "--port", str(PORT), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_for_port(PORT, timeout=30)
+        token = jwt.encode({"sub": "1", "role": "USER"}, env.get("JWT_SECRET", "super-secret-key"), algorithm="HS256")
+        # Every request hits the same few rows so SQLite's page cache is warm in both modes
+        url = f"http://127.0.0.1:{PORT}/products/{products // 2}"
+        return run_load(url, total, concurrency, headers={"Authorization": f"Bearer {token}"})
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="inventory-db-modes-bench-") as tmp:
+        db_path = os.path.join(tmp, "inventory.db")
+        seed_catalog(db_path, args.products)
+        for concurrency in args.concurrency:
+            for database_async in (False, True):
+                result = measure(db_path, database_async, args.products, args.requests, concurrency)
+                print_result(f"{'async' if database_async else 'sync'} c={concurrency}", result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Redis memory held by the consumer dedupe store after days of traffic
+
+Replays several days of processed-message IDs, ending now, into each dedupe
+layout and reports the live keys and bytes (``MEMORY USAGE``) left behind.
+The legacy layout is the old never-expiring SET and grows with ``--days``;
+the layouts from ``app/core/dedupe.py`` only hold the retention window, so
+their figures stay the same however many days are replayed. Needs a running
+Redis (``docker compose up redis``); a throwaway Redis DB index is used.
+
+    python -m benchmarks.dedupe_memory --days 4 --per-hour 20000
+"""
+import argparse
+import time
+
+import redis
+from inventory.app.config import settings
+from inventory.app.core.dedupe import DEDUPE_MODES, DedupeStore
+
+PREFIX = "bench:dedupe"
+BATCH = 1000
+
+
+def usage(redis_client, prefix: str) -> tuple:
+    """(live keys, bytes) under prefix"""
+    keys = list(redis_client.scan_iter(f"{prefix}*", count=1000))
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.memory_usage(key)
+    return len(keys), sum(size or 0 for size in pipe.execute())
+
+
+def replay(redis_client, mode: str, days: int, per_hour: int) -> tuple:
+    """Mark per_hour IDs for every hour of the last `days` days; returns what is left"""
+    prefix = f"{PREFIX}:{mode}"
+    for key in redis_client.scan_iter(f"{prefix}*", count=1000):
+        redis_client.delete(key)
+    store = DedupeStore(
+        prefix,
+        mode if mode != "legacy" else "buckets",
+        retention=settings.dedupe_retention_seconds,
+        bucket_seconds=settings.dedupe_bucket_seconds,
+        bloom_capacity=settings.dedupe_bloom_capacity,
+        bloom_error_rate=settings.dedupe_bloom_error_rate
+    )
+
+    start_ms = int((time.time() - days * 86400) * 1000)
+    spacing_ms = max(3600 * 1000 // per_hour, 1)
+    for hour in range(days * 24):
+        hour_ms = start_ms + hour * 3600 * 1000
+        ids = [f"{hour_ms + i * spacing_ms}-{i}" for i in range(per_hour)]
+        for offset in range(0, len(ids), BATCH):
+            pipe = redis_client.pipeline(transaction=False)
+            if mode == "legacy":
+                pipe.sadd(prefix, *ids[offset:offset + BATCH])
+            else:
+                store.mark(pipe, ids[offset:offset + BATCH])
+            pipe.execute()
+    result = usage(redis_client, prefix)
+
+    for key in redis_client.scan_iter(f"{prefix}*", count=1000):
+        redis_client.delete(key)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=4)
+    parser.add_argument("--per-hour", type=int, default=20000)
+    parser.add_argument("--redis-db", type=int, default=15)
+    args = parser.parse_args()
+
+    redis_client = redis.Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        password=settings.redis_password,
+        db=args.redis_db,
+        decode_responses=True
+    )
+
+    print(
+        f"{args.per_hour} IDs/hour for {args.days} days, retention {settings.dedupe_retention_seconds}s, "
+        f"buckets of {settings.dedupe_bucket_seconds}s"
+    )
+    print(f"{'mode':>8} {'keys':>8} {'MB':>8}")
+    for mode in ("legacy",) + DEDUPE_MODES:
+        keys, size = replay(redis_client, mode, args.days, args.per_hour)
+        print(f"{mode:>8} {keys:8d} {size / 2**20:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Throughput benchmark for the inventory order consumer
+
+Compares messages/sec of the per-message path (``process_order``) against the
+batch path (``process_batch``). Needs a running Redis (``docker compose up
+redis``); a throwaway SQLite database and Redis DB index are used.
+
+    python -m benchmarks.inventory_consumer_throughput --messages 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+# Point the inventory service at a throwaway database before it is imported
+_db_dir = tempfile.mkdtemp(prefix="inventory-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/inventory.db"
+
+import redis  # noqa: E402
+from inventory import consumer  # noqa: E402
+from inventory.app.config import settings  # noqa: E402
+from inventory.app.database import SessionLocal, init_db  # noqa: E402
+from inventory.app.models.product import Product  # noqa: E402
+
+GROUP = "bench-group"
+CONSUMER = "bench-consumer"
+
+
+def clear_dedupe(redis_client) -> None:
+    """Drop the consumer's processed-message keys so every run starts cold"""
+    for key in redis_client.scan_iter(f"{consumer.IDEMPOTENCY_KEY}:*", count=1000):
+        redis_client.delete(key)
+
+
+def seed_products(count: int) -> None:
+    """Create products with enough stock that no order is refunded"""
+    db = SessionLocal()
+    try:
+        db.query(Product).delete()
+        db.add_all(Product(id=i, name=f"product-{i}", price=1.0, quantity=10**9) for i in range(1, count + 1))
+        db.commit()
+    finally:
+        db.close()
+
+
+def run(redis_client, mode: str, messages: int, products: int, batch_size: int) -> float:
+    """Publish `messages` orders and drain them with the given mode, returning messages/sec"""
+    key = f"bench:order_completed:{mode}"
+    redis_client.delete(key)
+    clear_dedupe(redis_client)
+    redis_client.xgroup_create(name=key, groupname=GROUP, id="0", mkstream=True)
+
+    pipe = redis_client.pipeline(transaction=False)
+    for i in range(messages):
+        pipe.xadd(key, {"pk": str(i), "product_id": str(i % products + 1), "quantity": "1"})
+    pipe.execute()
+
+    start = time.perf_counter()
+    handled = 0
+    while handled < messages:
+        results = redis_client.xreadgroup(GROUP, CONSUMER, {key: ">"}, count=batch_size)
+        for _, batch in results:
+            if mode == "batch":
+                consumer.process_batch(redis_client, batch, key, GROUP)
+            else:
+                for message_id, order_data in batch:
+                    consumer.process_order(redis_client, order_data, message_id, key, GROUP)
+            handled += len(batch)
+    elapsed = time.perf_counter() - start
+
+    redis_client.delete(key)
+    clear_dedupe(redis_client)
+    return messages / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--redis-db", type=int, default=15)
+    args = parser.parse_args()
+
+    # Keep the consumer quiet; per-message log lines dominate otherwise
+    consumer.logger.setLevel("WARNING")
+
+    init_db()
+    redis_client = redis.Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        password=settings.redis_password,
+        db=args.redis_db,
+        decode_responses=True
+    )
+
+    print(f"{args.messages} messages, {args.products} products, batch size {args.batch_size}")
+    rates = {}
+    for mode in ("per-message", "batch"):
+        seed_products(args.products)
+        rates[mode] = run(redis_client, mode, args.messages, args.products, args.batch_size)
+        print(f"{mode:>12}: {rates[mode]:10.0f} msg/s")
+    print(f"{'speedup':>12}: {rates['batch'] / rates['per-message']:10.1f}x")
+
+    redis_client.delete("refund_order")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Peak server memory of GET /products vs GET /products/export by catalog size
+
+For each catalog size a fresh SQLite catalog is seeded and an inventory API
+is started with uvicorn in its own process. The whole catalog is then pulled
+once through the listing endpoint (page size raised to the catalog size, as
+a full-table client would) or once through the streaming export. The
+server's peak RSS (VmHWM) and the client's time to first byte are reported.
+
+    python -m benchmarks.inventory_export_memory --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from jose import jwt
+
+from benchmarks.load import _wait_for_port
+
+PORT = 8793
+
+
+def seed_catalog(path: str, size: int) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE products (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+        "price FLOAT NOT NULL, quantity INTEGER NOT NULL)"
+    )
+    conn.executemany(
+        "INSERT INTO products (id, name, price, quantity) VALUES (?, ?, ?, ?)",
+        ((i, f"product-{i:09d}", 9.99, 100) for i in range(1, size + 1))
+    )
+    conn.commit()
+    conn.close()
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def measure(db_path: str, size: int, path: str) -> tuple:
+    """Pull the catalog once through path; return (peak RSS MB, TTFB s, total s)"""
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        PRODUCTS_MAX_PAGE_SIZE=str(size),
+        PRODUCT_CACHE_ENABLED="false"
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "inventory.app.main:app", "--port", str(PORT), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_for_port(PORT, timeout=30)
+        token = jwt.encode({"sub": "1", "role": "USER"}, env.get("JWT_SECRET", "super-secret-key"), algorithm="HS256")
+        start = time.perf_counter()
+        ttfb = None
+        with httpx.stream(
+            "GET", f"http://127.0.0.1:{PORT}{path}", headers={"Authorization": f"Bearer {token}"}, timeout=600
+        ) as response:
+            response.raise_for_status()
+            for _ in response.iter_raw():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - start
+        return peak_rss_mb(server.pid), ttfb, time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'endpoint':>20} {'peak RSS MB':>12} {'TTFB ms':>10} {'total s':>9}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix="inventory-export-bench-") as tmp:
+            db_path = os.path.join(tmp, "inventory.db")
+            seed_catalog(db_path, size)
+            for label, path in (("GET /products", f"/products?limit={size}"), ("GET /products/export", "/products/export")):
+                rss, ttfb, total = measure(db_path, size, path)
+                print(f"{size:>10} {label:>20} {rss:>12.1f} {ttfb * 1000:>10.1f} {total:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
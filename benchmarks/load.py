@@ -0,0 +1,85 @@
+"""Helpers shared by the HTTP load benchmarks"""
+import asyncio
+import contextlib
+import multiprocessing
+import socket
+import time
+from typing import Dict, Optional
+
+import httpx
+import uvicorn
+
+
+def _wait_for_port(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", port), timeout=0.1):
+            return
+        time.sleep(0.05)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+@contextlib.contextmanager
+def serve(app, port: int):
+    """Run an ASGI app with uvicorn in a child process for the duration of the block"""
+    process = multiprocessing.get_context("fork").Process(
+        target=uvicorn.run,
+        args=(app,),
+        kwargs={"host": "127.0.0.1", "port": port, "log_level": "warning"},
+        daemon=True
+    )
+    process.start()
+    try:
+        _wait_for_port(port)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.join()
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _load(url: str, total: int, concurrency: int, headers: Optional[dict]) -> Dict[str, float]:
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=60.0, headers=headers) as client:
+        async def worker() -> None:
+            nonlocal errors
+            for _ in remaining:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "rps": total / elapsed,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "errors": errors
+    }
+
+
+def run_load(url: str, total: int = 2000, concurrency: int = 50, headers: Optional[dict] = None) -> Dict[str, float]:
+    """GET url `total` times from `concurrency` workers and return rps and latency percentiles"""
+    return asyncio.run(_load(url, total, concurrency, headers))
+
+
+def print_result(label: str, result: Dict[str, float]) -> None:
+    print(
+        f"{label:>12}: {result['rps']:8.0f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+        f"p99 {result['p99_ms']:7.1f} ms  errors {result['errors']}"
+    )
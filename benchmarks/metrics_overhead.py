@@ -0,0 +1,70 @@
+"""Cost of the metrics collector: per observation and per request
+
+Times Histogram.observe from 1..N threads at once, then drives a trivial
+ASGI app directly (no server, no HTTP parsing) with and without
+MetricsMiddleware so the difference is the middleware's own per-request cost.
+
+    python -m benchmarks.metrics_overhead --observations 1000000 --threads 1 4
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from inventory.app.core.metrics import Histogram, MetricsMiddleware
+
+SCOPE = {"type": "http", "method": "GET", "path": "/products/1", "headers": []}
+
+
+def observe_ns(observations: int, threads: int) -> float:
+    histogram = Histogram("bench_seconds", "benchmark", ("route",))
+    per_thread = observations // threads
+
+    def work() -> None:
+        for i in range(per_thread):
+            histogram.observe(i * 1e-6, "/products/{product_id}")
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (per_thread * threads) * 1e9
+
+
+async def plain_app(scope, receive, send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def request_us(app, requests: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(SCOPE), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--observations", type=int, default=1000000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--requests", type=int, default=200000)
+    args = parser.parse_args()
+
+    for threads in args.threads:
+        print(f"observe, {threads} threads: {observe_ns(args.observations, threads):8.0f} ns/observation")
+    bare = asyncio.run(request_us(plain_app, args.requests))
+    wrapped = asyncio.run(request_us(MetricsMiddleware(plain_app), args.requests))
+    print(f"ASGI request, no middleware: {bare:6.2f} us")
+    print(f"ASGI request, metrics:       {wrapped:6.2f} us (+{wrapped - bare:.2f} us)")
+
+
+if __name__ == "__main__":
+    main()
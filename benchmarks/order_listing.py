@@ -0,0 +1,113 @@
+"""Payment order listing: cost of a filtered keyset page by index layout
+
+The database is seeded with mostly completed orders and a sprinkling of
+pending ones, then pages of ``status=pending`` (and of one product) are read
+with ``get_orders_page`` from the start and from deep cursors. This is run
+once with the composite ``(status, id)`` / ``(product_id, id)`` indexes and
+once with single-column indexes only, as the orders table had before.
+
+On SQLite every index already ends with the rowid (the order ID), so only
+the combined status + product filter differs there. Point DATABASE_URL at a
+scratch Postgres database to see the single-column index sort every
+matching row instead of reading one page. The orders table is overwritten.
+
+    DATABASE_URL=postgresql://localhost/bench python -m benchmarks.order_listing --orders 500000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+# Default to a throwaway SQLite database, set before the service is imported
+if "DATABASE_URL" not in os.environ:
+    _db_dir = tempfile.mkdtemp(prefix="payment-listing-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/payment.db"
+
+from sqlalchemy import insert, text  # noqa: E402
+from payment.app.database import SessionLocal, engine, init_db  # noqa: E402
+from payment.app.models.order import Order, OrderStatus  # noqa: E402
+from payment.app.repositories import order as order_repo  # noqa: E402
+
+# Plain DDL, so these never join the model's metadata
+LEGACY_INDEXES = {
+    "ix_orders_status": "status",
+    "ix_orders_product_id": "product_id",
+}
+
+
+def seed_orders(count: int, pending_every: int, products: int) -> None:
+    init_db()
+    rows = [
+        {
+            "id": i,
+            "product_id": i % products + 1,
+            "price": 10.0,
+            "fee": 2.0,
+            "total": 12.0,
+            "quantity": 1,
+            "status": OrderStatus.PENDING if i % pending_every == 0 else OrderStatus.COMPLETED
+        }
+        for i in range(1, count + 1)
+    ]
+    with engine.begin() as conn:
+        conn.execute(Order.__table__.delete())
+        for start in range(0, count, 50000):
+            conn.execute(insert(Order), rows[start:start + 50000])
+
+
+def use_layout(composite: bool) -> None:
+    for index in Order.__table__.indexes:
+        index.drop(engine, checkfirst=True)
+    with engine.begin() as conn:
+        for name, column in LEGACY_INDEXES.items():
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            if not composite:
+                conn.execute(text(f"CREATE INDEX {name} ON orders ({column})"))
+    if composite:
+        for index in Order.__table__.indexes:
+            index.create(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def time_page(repeats: int, limit: int, cursor, **filters) -> float:
+    """Mean milliseconds to fetch one page"""
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            order_repo.get_orders_page(db, limit, cursor, **filters)
+            db.expunge_all()
+        return (time.perf_counter() - start) / repeats * 1000
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--pending-every", type=int, default=100)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    seed_orders(args.orders, args.pending_every, args.products)
+    deep = args.orders * 9 // 10
+    cases = (
+        ("pending, first page", None, {"status": OrderStatus.PENDING}),
+        ("pending, deep cursor", deep, {"status": OrderStatus.PENDING}),
+        ("pending + product", None, {"status": OrderStatus.PENDING, "product_id": args.pending_every}),
+        ("product, deep cursor", deep, {"product_id": 1}),
+    )
+    print(f"{args.orders} orders, 1 in {args.pending_every} pending, page size {args.limit}")
+    for composite in (False, True):
+        use_layout(composite)
+        label = "composite" if composite else "single-column"
+        for name, cursor, filters in cases:
+            ms = time_page(args.repeats, args.limit, cursor, **filters)
+            print(f"{label:>13} | {name:<22}: {ms:8.2f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
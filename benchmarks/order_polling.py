@@ -0,0 +1,85 @@
+"""Payment GET /orders/{id} polling throughput with and without the order cache
+
+A SQLite database is seeded with orders, then the payment API is started
+with uvicorn in its own process per mode. Pollers hit one order repeatedly
+as clients waiting for a status change do: with the cache disabled (a DB
+query and serialization per request), with the cache enabled, and with the
+cache enabled and If-None-Match set so every poll is answered with a 304.
+Redis is optional; without it the cache simply is not pushed updates.
+
+    python -m benchmarks.order_polling --requests 3000 --concurrency 10
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from jose import jwt
+
+# Point the payment service at a throwaway database before it is imported
+_db_dir = tempfile.mkdtemp(prefix="payment-polling-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/payment.db"
+
+from benchmarks.load import _wait_for_port, print_result, run_load  # noqa: E402
+from payment.app.core.order_cache import order_etag  # noqa: E402
+from payment.app.database import SessionLocal, init_db  # noqa: E402
+from payment.app.models.order import Order, OrderStatus  # noqa: E402
+
+PORT = 8795
+
+
+def seed_orders(count: int) -> None:
+    init_db()
+    db = SessionLocal()
+    try:
+        db.query(Order).delete()
+        db.add_all(
+            Order(id=i, product_id=1, price=10.0, fee=2.0, total=12.0, quantity=1, status=OrderStatus.COMPLETED)
+            for i in range(1, count + 1)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def measure(cache_enabled: bool, conditional: bool, order_id: int, total: int, concurrency: int) -> dict:
+    env = dict(os.environ, ORDER_CACHE_ENABLED=str(cache_enabled).lower())
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "payment.app.main:app", "--port", str(PORT), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_for_port(PORT, timeout=30)
+        token = jwt.encode({"sub": "1", "role": "USER"}, env.get("JWT_SECRET", "super-secret-key"), algorithm="HS256")
+        headers = {"Authorization": f"Bearer {token}"}
+        if conditional:
+            headers["If-None-Match"] = order_etag(order_id, OrderStatus.COMPLETED.value)
+        return run_load(f"http://127.0.0.1:{PORT}/orders/{order_id}", total, concurrency, headers=headers)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    seed_orders(args.orders)
+    order_id = args.orders // 2
+    for label, cache_enabled, conditional in (
+        ("no cache", False, False),
+        ("cache", True, False),
+        ("cache + 304", True, True)
+    ):
+        result = measure(cache_enabled, conditional, order_id, args.requests, args.concurrency)
+        print_result(label, result)
+
+
+if __name__ == "__main__":
+    main()
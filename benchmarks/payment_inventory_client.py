@@ -0,0 +1,85 @@
+"""Load test for payment's product lookup against a stub inventory service
+
+Serves a stub inventory app plus two payment-side apps: one with the old
+synchronous ``requests.get`` per call, and one with the pooled
+``httpx.AsyncClient`` from ``payment.app.clients.inventory``. Reports
+requests/sec and p50/p99 latency for each.
+
+    python -m benchmarks.payment_inventory_client --requests 5000 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+STUB_PORT = 8790
+os.environ["INVENTORY_SERVICE_URL"] = f"http://127.0.0.1:{STUB_PORT}"
+
+import requests  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from benchmarks.load import print_result, run_load, serve  # noqa: E402
+from payment.app.clients.inventory import create_inventory_client, fetch_product  # noqa: E402
+
+
+def stub_inventory_app(latency_ms: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/products/{product_id}")
+    async def get_product(product_id: int):
+        await asyncio.sleep(latency_ms / 1000)
+        return {"id": product_id, "name": f"product-{product_id}", "price": 10.0, "quantity": 100}
+
+    return app
+
+
+def legacy_app() -> FastAPI:
+    """The pre-pooling code path: sync handler, new connection per request"""
+    app = FastAPI()
+
+    @app.get("/lookup/{product_id}")
+    def lookup(request: Request, product_id: int):
+        response = requests.get(
+            f"{os.environ['INVENTORY_SERVICE_URL']}/products/{product_id}",
+            headers={"Authorization": request.headers.get("Authorization")},
+            timeout=10.0
+        )
+        response.raise_for_status()
+        return response.json()
+
+    return app
+
+
+def pooled_app() -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.inventory_client = create_inventory_client()
+        yield
+        await app.state.inventory_client.aclose()
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.get("/lookup/{product_id}")
+    async def lookup(request: Request, product_id: int):
+        return await fetch_product(request.app.state.inventory_client, product_id, request.headers.get("Authorization"))
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="simulated inventory latency")
+    args = parser.parse_args()
+
+    headers = {"Authorization": "Bearer benchmark"}
+    print(f"{args.requests} requests, concurrency {args.concurrency}, inventory latency {args.latency_ms} ms")
+    with serve(stub_inventory_app(args.latency_ms), STUB_PORT):
+        for label, app, port in (("requests", legacy_app(), STUB_PORT + 1), ("httpx pool", pooled_app(), STUB_PORT + 2)):
+            with serve(app, port) as url:
+                run_load(f"{url}/lookup/1", min(200, args.requests), args.concurrency, headers)  # warm-up
+                print_result(label, run_load(f"{url}/lookup/1", args.requests, args.concurrency, headers))
+
+
+if __name__ == "__main__":
+    main()
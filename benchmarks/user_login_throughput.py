@@ -0,0 +1,51 @@
+"""Password verification throughput (logins/sec) against hashing pool size
+
+Verifies the same argon2 hash many times concurrently: once inline on the
+event loop, as the old handlers did, and then through HashingPool with 1..N
+worker processes. Argon2 cost comes from the user service Settings
+(ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM).
+
+    python -m benchmarks.user_login_throughput --logins 200 --max-workers 8
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from user.app.auth.hashing import Hash, HashingPool
+
+
+async def pooled(workers: int, hashed: str, logins: int) -> float:
+    pool = HashingPool(workers, max_pending=logins)
+    pool.start()
+    try:
+        await asyncio.gather(*(pool.verify(hashed, "password") for _ in range(workers)))  # spawn workers
+        start = time.perf_counter()
+        await asyncio.gather(*(pool.verify(hashed, "password") for _ in range(logins)))
+        return logins / (time.perf_counter() - start)
+    finally:
+        pool.shutdown()
+
+
+def inline(hashed: str, logins: int) -> float:
+    start = time.perf_counter()
+    for _ in range(logins):
+        Hash.verify(hashed, "password")
+    return logins / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    hashed = Hash.hash("password")
+    print(f"{args.logins} logins, {os.cpu_count()} CPUs, hash {hashed.split('$')[3]}")
+    print(f"{'inline':>10}: {inline(hashed, args.logins):8.1f} logins/s")
+    for workers in range(1, args.max_workers + 1):
+        print(f"{f'{workers} workers':>10}: {asyncio.run(pooled(workers, hashed, args.logins)):8.1f} logins/s")
+
+
+if __name__ == "__main__":
+    main()
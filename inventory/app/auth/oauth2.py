@@ -11,7 +11,7 @@ def get_current_user(token: HTTPAuthorizationCredentials = Depends(security)) ->
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    return jwt.verify_token(token.credentials, credentials_exception)
+    return jwt.verify_token_cached(token.credentials, credentials_exception)
 
 def admin_required(user: dict = Depends(get_current_user)):
     if user.get("role") != "ADMIN":
@@ -14,6 +14,18 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = "sqlite:///./inventory.db"
+    database_async: bool = False
+    # 20 + 20 matches the AnyIO threadpool (40 threads) that sync routes run on
+    db_pool_size: int = 20
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0  # seconds
+    db_pool_recycle: int = 1800  # seconds, server databases only
+    db_pool_pre_ping: bool = True  # server databases only
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size: int = 268435456  # 256 MiB
     
     # CORS
     cors_origins: List[str] = ["http://localhost:3000"]
@@ -25,6 +37,43 @@ class Settings(BaseSettings):
     redis_port: int = 6379
     redis_password: Optional[str] = None
     
+    # Product listing
+    products_page_size: int = 100
+    products_max_page_size: int = 1000
+    products_export_chunk_size: int = 1000
+    products_bulk_max_items: int = 1000
+    products_multi_get_max_ids: int = 100
+    
+    # Product cache
+    product_cache_enabled: bool = True
+    product_cache_max_size: int = 10000
+    product_listing_cache_max_size: int = 100  # pages, each up to PRODUCTS_MAX_PAGE_SIZE rows
+    product_cache_ttl: float = 30.0  # seconds
+    
+    # Processed-message dedupe for the consumers
+    dedupe_mode: str = "buckets"  # "buckets", "keys" or "bloom" (see app/core/dedupe.py)
+    dedupe_retention_seconds: int = 86400  # must outlast redelivery; entries dead-letter well before
+    dedupe_bucket_seconds: int = 3600
+    dedupe_bloom_capacity: int = 100000  # IDs per bucket at the target error rate
+    dedupe_bloom_error_rate: float = 0.001
+    dedupe_claim_seconds: int = 60  # in-flight claim on an order event; must outlast a batch
+    
+    # Consumer
+    consumer_engine: str = "sync"  # "sync" or "asyncio" (always batches)
+    consumer_concurrency: int = 4  # batches in flight per worker, asyncio engine only
+    consumer_batch_mode: bool = True
+    consumer_batch_size: int = 10
+    consumer_block_ms: int = 5000
+    consumer_workers: int = 1
+    consumer_worker_mode: str = "thread"  # "thread" or "process" (one core each)
+    consumer_shutdown_timeout: float = 30.0  # seconds to drain on SIGTERM
+    consumer_metrics_port: int = 9100  # 0 disables the metrics server
+    consumer_reclaim_min_idle_ms: int = 60000  # pending this long counts as abandoned
+    consumer_reclaim_batch_size: int = 50
+    consumer_reclaim_interval: float = 5.0  # seconds between reclaim batches
+    consumer_max_deliveries: int = 5  # then the entry goes to <stream>:dlq
+    consumer_dlq_maxlen: int = 100000
+    
     # Application
     app_name: str = "Inventory Service"
     app_version: str = "1.0.0"
@@ -34,6 +83,8 @@ class Settings(BaseSettings):
     JWT_SECRET: str = "super-secret-key"
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRE_MINUTES: int = 60
+    jwt_cache_enabled: bool = True
+    jwt_cache_max_size: int = 10000
 
 
 settings = Settings()
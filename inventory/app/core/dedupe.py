@@ -0,0 +1,227 @@
+"""Expiring, memory-bounded record of processed stream messages.
+
+Consumers used to SADD every processed message ID into one set forever.
+DedupeStore keeps IDs only for a retention window, in one of three layouts:
+
+- "buckets": one set per time bucket, keyed by the bucket the stream ID's
+  timestamp falls in and expiring `retention` after the bucket closes. A
+  redelivered message always maps to the same bucket, so the lookup is exact
+  for the whole window. One SMISMEMBER per bucket touched by a batch.
+- "keys": one `SET NX EXAT` key per message, expiring `retention` after the
+  stream ID's timestamp. Simplest, at the cost of a key (and its overhead)
+  per ID.
+- "bloom": one Bloom filter bitmap per time bucket, read and written with
+  BITFIELD. Fixed memory per bucket regardless of volume, but a false
+  positive (at most `bloom_error_rate` at `bloom_capacity` IDs per bucket)
+  makes a new message look processed and it is skipped.
+
+Lookups build a single pipeline for a whole batch; mark() only queues
+commands, so it can share the caller's pipeline with the ack.
+
+A lookup followed later by mark() is not enough when the same ID can be in
+flight twice (concurrent batches, several workers, a replayed outbox
+event): both copies pass the lookup. Consumers whose side effects are not
+idempotent claim() IDs instead, which takes a short-lived `SET NX` lock per
+ID and then does the lookup in the same pipeline. Holders mark before they
+release, so a later claimant of a finished ID always sees it processed.
+"""
+import hashlib
+import math
+import uuid
+from typing import Dict, List, Sequence, Tuple
+
+DEDUPE_MODES = ("buckets", "keys", "bloom")
+
+# claim() outcomes per ID
+CLAIMED = "claimed"  # ours to process; mark, then release
+PROCESSED = "processed"  # already done; skip and ack
+BUSY = "busy"  # another consumer holds it; leave it pending
+
+# Delete the claims still held with token ARGV[1]; an expired claim that
+# someone else has taken since is left alone
+RELEASE_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    if redis.call('GET', key) == ARGV[1] then
+        redis.call('DEL', key)
+    end
+end
+return 0
+"""
+
+
+def _id_timestamp_ms(message_id: str) -> int:
+    # Stream IDs start with their creation time in milliseconds
+    return int(str(message_id).split("-")[0])
+
+
+class DedupeStore:
+    """Processed-message lookups with a retention window"""
+
+    def __init__(
+        self,
+        prefix: str,
+        mode: str,
+        retention: int,
+        bucket_seconds: int,
+        bloom_capacity: int,
+        bloom_error_rate: float,
+        claim_seconds: int = 60
+    ):
+        if mode not in DEDUPE_MODES:
+            raise ValueError(f"Unknown dedupe mode {mode!r}, expected one of {DEDUPE_MODES}")
+        self.prefix = prefix
+        self.mode = mode
+        self.retention = retention
+        self.bucket_ms = max(bucket_seconds, 1) * 1000
+        # Must outlast processing a batch, or a slow holder's ID can be claimed again
+        self.claim_ms = max(claim_seconds, 1) * 1000
+        # Standard Bloom sizing: m = -n ln(p) / ln(2)^2 bits, k = m/n ln(2) hashes
+        self.bloom_bits = max(int(-bloom_capacity * math.log(bloom_error_rate) / math.log(2) ** 2), 8)
+        self.bloom_hashes = max(round(self.bloom_bits / bloom_capacity * math.log(2)), 1)
+
+    def _bucket(self, message_id: str) -> int:
+        return _id_timestamp_ms(message_id) // self.bucket_ms
+
+    def _bucket_key(self, bucket: int) -> str:
+        kind = "bloom" if self.mode == "bloom" else "bucket"
+        return f"{self.prefix}:{kind}:{bucket}"
+
+    def _bucket_expires_at(self, bucket: int) -> int:
+        # Unix seconds; keeps every ID at least `retention` past its stream timestamp
+        return (bucket + 1) * self.bucket_ms // 1000 + self.retention
+
+    def _key(self, message_id: str) -> str:
+        return f"{self.prefix}:{message_id}"
+
+    def _claim_key(self, message_id: str) -> str:
+        return f"{self.prefix}:claim:{message_id}"
+
+    def _bloom_offsets(self, message_id: str) -> List[int]:
+        digest = hashlib.blake2b(str(message_id).encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.bloom_bits for i in range(self.bloom_hashes)]
+
+    def _by_bucket(self, message_ids: Sequence[str]) -> Dict[int, List[str]]:
+        buckets: Dict[int, List[str]] = {}
+        for message_id in message_ids:
+            buckets.setdefault(self._bucket(message_id), []).append(message_id)
+        return buckets
+
+    def _queue_lookup(self, pipe, message_ids: Sequence[str]) -> List[Tuple[str, List[str]]]:
+        """Queue lookup commands; returns how to map replies back to IDs"""
+        plan = []
+        if self.mode == "keys":
+            for message_id in message_ids:
+                pipe.exists(self._key(message_id))
+                plan.append(("key", [message_id]))
+        elif self.mode == "buckets":
+            for bucket, ids in self._by_bucket(message_ids).items():
+                pipe.smismember(self._bucket_key(bucket), ids)
+                plan.append(("set", ids))
+        else:
+            for message_id in message_ids:
+                command = []
+                for offset in self._bloom_offsets(message_id):
+                    command += ["GET", "u1", offset]
+                pipe.execute_command("BITFIELD", self._bucket_key(self._bucket(message_id)), *command)
+                plan.append(("bloom", [message_id]))
+        return plan
+
+    @staticmethod
+    def _parse_lookup(message_ids: Sequence[str], plan, replies) -> List[bool]:
+        seen: Dict[str, bool] = {}
+        for (kind, ids), reply in zip(plan, replies):
+            if kind == "set":
+                seen.update((message_id, bool(hit)) for message_id, hit in zip(ids, reply))
+            elif kind == "bloom":
+                seen[ids[0]] = all(reply)
+            else:
+                seen[ids[0]] = bool(reply)
+        return [seen[message_id] for message_id in message_ids]
+
+    def seen(self, redis_client, message_ids: Sequence[str]) -> List[bool]:
+        """Whether each ID was processed within the window, in one round trip"""
+        if not message_ids:
+            return []
+        pipe = redis_client.pipeline(transaction=False)
+        plan = self._queue_lookup(pipe, message_ids)
+        return self._parse_lookup(message_ids, plan, pipe.execute())
+
+    async def seen_async(self, redis_client, message_ids: Sequence[str]) -> List[bool]:
+        """seen() for a redis.asyncio client"""
+        if not message_ids:
+            return []
+        pipe = redis_client.pipeline(transaction=False)
+        plan = self._queue_lookup(pipe, message_ids)
+        return self._parse_lookup(message_ids, plan, await pipe.execute())
+
+    def _queue_claim(self, pipe, message_ids: Sequence[str], token: str) -> List[Tuple[str, List[str]]]:
+        for message_id in message_ids:
+            pipe.set(self._claim_key(message_id), token, nx=True, px=self.claim_ms)
+        # Queued after the claims, so a holder that has marked and released is seen
+        return self._queue_lookup(pipe, message_ids)
+
+    def _parse_claim(self, message_ids: Sequence[str], plan, replies) -> List[str]:
+        acquired = replies[:len(message_ids)]
+        seen = self._parse_lookup(message_ids, plan, replies[len(message_ids):])
+        return [
+            PROCESSED if is_seen else CLAIMED if got else BUSY
+            for got, is_seen in zip(acquired, seen)
+        ]
+
+    def claim(self, redis_client, message_ids: Sequence[str]) -> Tuple[str, List[str]]:
+        """Claim IDs for processing, in one round trip.
+
+        Returns (token, outcomes): CLAIMED, PROCESSED or BUSY per ID. Pass the
+        token to release() once the claimed IDs are marked or have failed.
+        """
+        token = uuid.uuid4().hex
+        if not message_ids:
+            return token, []
+        pipe = redis_client.pipeline(transaction=False)
+        plan = self._queue_claim(pipe, message_ids, token)
+        return token, self._parse_claim(message_ids, plan, pipe.execute())
+
+    async def claim_async(self, redis_client, message_ids: Sequence[str]) -> Tuple[str, List[str]]:
+        """claim() for a redis.asyncio client"""
+        token = uuid.uuid4().hex
+        if not message_ids:
+            return token, []
+        pipe = redis_client.pipeline(transaction=False)
+        plan = self._queue_claim(pipe, message_ids, token)
+        return token, self._parse_claim(message_ids, plan, await pipe.execute())
+
+    def release(self, redis_client, message_ids: Sequence[str], token: str) -> None:
+        """Drop the claims taken with token; IDs not held with it are ignored.
+
+        Queue it after mark() on the same pipeline (sync or asyncio) so the
+        mark is visible before the claim goes away.
+        """
+        if message_ids:
+            keys = [self._claim_key(message_id) for message_id in message_ids]
+            redis_client.eval(RELEASE_SCRIPT, len(keys), *keys, token)
+
+    def mark(self, redis_client, message_ids: Sequence[str]) -> None:
+        """Record IDs as processed.
+
+        redis_client may be a pipeline (sync or asyncio), in which case the
+        commands are sent with it.
+        """
+        if not message_ids:
+            return
+        if self.mode == "keys":
+            for message_id in message_ids:
+                expires_at = _id_timestamp_ms(message_id) // 1000 + self.retention
+                redis_client.set(self._key(message_id), 1, nx=True, exat=expires_at)
+            return
+        for bucket, ids in self._by_bucket(message_ids).items():
+            key = self._bucket_key(bucket)
+            if self.mode == "buckets":
+                redis_client.sadd(key, *ids)
+            else:
+                command = []
+                for message_id in ids:
+                    for offset in self._bloom_offsets(message_id):
+                        command += ["SET", "u1", offset, 1]
+                redis_client.execute_command("BITFIELD", key, *command)
+            redis_client.expireat(key, self._bucket_expires_at(bucket))
@@ -0,0 +1,182 @@
+"""Read-through product cache with Redis pub/sub invalidation"""
+import threading
+import time
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence
+from sqlalchemy.orm import Session
+from inventory.app.config import settings
+from inventory.app.core.cache import TTLCache
+from inventory.app.core.logging import setup_logging
+from inventory.app.repositories import product as product_repo
+from inventory.app.schemas.product import ProductResponse
+
+logger = setup_logging("inventory-cache")
+
+# Messages are comma-separated product IDs, or "*" to drop everything
+INVALIDATION_CHANNEL = "inventory:products:invalidate"
+INVALIDATE_ALL = "*"
+
+
+def publish_invalidation(redis_client, product_ids: Iterable[int]) -> None:
+    """Tell every API replica to drop the given products.
+
+    redis_client may be a pipeline, in which case the publish is sent with it.
+    """
+    message = ",".join(str(product_id) for product_id in product_ids)
+    if message:
+        redis_client.publish(INVALIDATION_CHANNEL, message)
+
+
+class ProductCache:
+    """Caches product lookups and listings in front of the product repository.
+
+    Entries expire after a TTL and are dropped early when any replica or the
+    consumer publishes an invalidation. Any product change also drops all
+    cached listings.
+    """
+
+    def __init__(self, max_size: int, ttl: float, listing_max_size: int):
+        self.products = TTLCache(max_size, ttl)
+        # A listing is a whole page of rows, so far fewer of them are kept
+        self.listings = TTLCache(listing_max_size, ttl)
+        self.redis = None
+        # Guards the generation, so a fill cannot land between an
+        # invalidation's bump and its drop
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._listener = None
+
+    def _fill(self, cache: TTLCache, entries: Dict[Hashable, Any], generation: int) -> None:
+        """Cache entries read at generation, unless an invalidation ran since"""
+        with self._lock:
+            if generation == self._generation:
+                for key, value in entries.items():
+                    cache.set(key, value)
+
+    def get_product(self, db: Session, product_id: int) -> Optional[ProductResponse]:
+        """Get a product by ID, loading it from the database on a miss"""
+        if not settings.product_cache_enabled:
+            product = product_repo.get_product_by_id(db, product_id)
+            return ProductResponse.model_validate(product) if product else None
+
+        cached = self.products.get(product_id)
+        if cached is not None:
+            return cached
+
+        generation = self._generation
+        product = product_repo.get_product_by_id(db, product_id)
+        if not product:
+            return None
+        cached = ProductResponse.model_validate(product)
+        # Skipped if an invalidation raced with the read
+        self._fill(self.products, {product_id: cached}, generation)
+        return cached
+
+    def get_products(self, db: Session, product_ids: List[int]) -> Dict[int, ProductResponse]:
+        """Get many products by ID, loading all cache misses with one query"""
+        found = {}
+        missing = product_ids
+        if settings.product_cache_enabled:
+            missing = []
+            for product_id in product_ids:
+                cached = self.products.get(product_id)
+                if cached is None:
+                    missing.append(product_id)
+                else:
+                    found[product_id] = cached
+        if not missing:
+            return found
+
+        generation = self._generation
+        loaded = {
+            product.id: ProductResponse.model_validate(product)
+            for product in product_repo.get_products_by_ids(db, missing)
+        }
+        if settings.product_cache_enabled:
+            self._fill(self.products, loaded, generation)
+        found.update(loaded)
+        return found
+
+    def get_products_page(
+        self,
+        db: Session,
+        limit: int,
+        cursor: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+        fields: Sequence[str] = product_repo.PRODUCT_FIELDS
+    ) -> List[dict]:
+        """Get a page of products, loading it from the database on a miss"""
+        if not settings.product_cache_enabled:
+            return product_repo.get_products_page(db, limit, cursor, name_prefix, fields)
+
+        key = (limit, cursor, name_prefix, tuple(fields))
+        cached = self.listings.get(key)
+        if cached is not None:
+            return cached
+
+        generation = self._generation
+        cached = product_repo.get_products_page(db, limit, cursor, name_prefix, fields)
+        self._fill(self.listings, {key: cached}, generation)
+        return cached
+
+    def invalidate(self, *product_ids: int) -> None:
+        """Drop products locally and publish the invalidation to other replicas"""
+        self.drop(product_ids)
+        if self.redis is not None:
+            try:
+                publish_invalidation(self.redis, product_ids)
+            except Exception as e:
+                logger.warning(f"Failed to publish cache invalidation: {e}")
+
+    def drop(self, product_ids: Iterable[int]) -> None:
+        """Drop products (and every listing) from the local cache only"""
+        with self._lock:
+            self._generation += 1
+            for product_id in product_ids:
+                self.products.pop(product_id)
+            self.listings.clear()
+
+    def drop_all(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.products.clear()
+            self.listings.clear()
+
+    def _on_message(self, message: dict) -> None:
+        data = message["data"]
+        if data == INVALIDATE_ALL:
+            self.drop_all()
+        else:
+            self.drop(int(product_id) for product_id in data.split(","))
+
+    def _on_error(self, error: Exception, pubsub, thread) -> None:
+        # Invalidations may have been missed while disconnected
+        logger.warning(f"Cache invalidation listener error: {error}")
+        self.drop_all()
+        time.sleep(1.0)
+
+    def start(self, redis_client) -> None:
+        """Start publishing and listening for invalidations on redis_client"""
+        self.redis = redis_client
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{INVALIDATION_CHANNEL: self._on_message})
+            self._listener = pubsub.run_in_thread(
+                sleep_time=1.0, daemon=True, exception_handler=self._on_error
+            )
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener not started, relying on TTL: {e}")
+
+    def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def stats(self) -> dict:
+        return {"products": self.products.stats(), "listings": self.listings.stats()}
+
+
+product_cache = ProductCache(
+    settings.product_cache_max_size,
+    settings.product_cache_ttl,
+    settings.product_listing_cache_max_size
+)
@@ -0,0 +1,27 @@
+"""Redis client that records per-command latency"""
+import redis
+from redis.client import Pipeline
+from inventory.app.core.metrics import registry
+
+REDIS_COMMAND_SECONDS = registry.histogram(
+    "redis_command_duration_seconds",
+    "Redis round-trip latency by command (pipelines as PIPELINE)",
+    ("command",)
+)
+
+
+class InstrumentedPipeline(Pipeline):
+    def execute(self, raise_on_error=True):
+        with REDIS_COMMAND_SECONDS.time("PIPELINE"):
+            return super().execute(raise_on_error)
+
+
+class InstrumentedRedis(redis.Redis):
+    """redis.Redis timing every command and pipeline it sends"""
+
+    def execute_command(self, *args, **options):
+        with REDIS_COMMAND_SECONDS.time(str(args[0]).upper()):
+            return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
@@ -0,0 +1,111 @@
+"""Run several stream consumer workers in one container.
+
+Each worker gets a unique consumer name within the group
+("<hostname>-<index>") and opens its own Redis client and DB sessions.
+Threads suit I/O-bound handlers; processes (spawned, so nothing is shared
+with the parent) let one container use every core. SIGTERM or SIGINT sets a
+shared stop event: workers finish the batch in hand, stop reading, and the
+runner waits up to the shutdown timeout before killing stragglers.
+"""
+import multiprocessing
+import signal
+import socket
+import threading
+import time
+from typing import Callable, List, Union
+
+from inventory.app.core.consumer_metrics import start_metrics_server
+from inventory.app.core.logging import setup_logging
+
+logger = setup_logging("consumer-runner")
+
+WORKER_MODES = ("thread", "process")
+
+StopEvent = Union[threading.Event, "multiprocessing.synchronize.Event"]
+Worker = Callable[[str, StopEvent], None]
+
+
+def worker_names(count: int) -> List[str]:
+    hostname = socket.gethostname()
+    return [f"{hostname}-{index}" for index in range(count)]
+
+
+def _process_main(target: Worker, consumer_name: str, stop_event: StopEvent, metrics_port: int) -> None:
+    # Only the parent reacts to signals; workers stop through the shared event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    start_metrics_server(metrics_port)
+    target(consumer_name, stop_event)
+
+
+def _install_stop_handlers(stop_requested: threading.Event) -> None:
+    # The handler only flips a local flag: setting a multiprocessing Event
+    # from a signal handler can deadlock against the main thread's own wait()
+    def stop(signum, frame):
+        stop_requested.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+
+def run_workers(target: Worker, workers: int, mode: str, shutdown_timeout: float, metrics_port: int = 0) -> None:
+    """Run target(consumer_name, stop_event) in `workers` threads or processes.
+
+    Blocks until every worker has returned, and exits with status 1 if a
+    worker died on its own so the orchestrator restarts the container. In process mode each worker
+    serves its own metrics on metrics_port + index, since counters live in
+    the worker's memory; in thread mode one server covers them all.
+    """
+    if mode not in WORKER_MODES:
+        raise ValueError(f"Unknown consumer worker mode {mode!r}, expected one of {WORKER_MODES}")
+    workers = max(workers, 1)
+    names = worker_names(workers)
+
+    if mode == "process":
+        context = multiprocessing.get_context("spawn")
+        stop_event = context.Event()
+        handles = [
+            context.Process(
+                target=_process_main,
+                args=(target, name, stop_event, metrics_port + index if metrics_port else 0),
+                name=name
+            )
+            for index, name in enumerate(names)
+        ]
+    else:
+        stop_event = threading.Event()
+        start_metrics_server(metrics_port)
+        handles = [
+            threading.Thread(target=target, args=(name, stop_event), name=name, daemon=True)
+            for name in names
+        ]
+
+    stop_requested = threading.Event()
+    _install_stop_handlers(stop_requested)
+    logger.info(f"Starting {workers} consumer {mode} worker(s): {', '.join(names)}")
+    for handle in handles:
+        handle.start()
+
+    # A worker that dies stops the rest so the container restarts at full strength
+    failed = False
+    while not stop_requested.wait(1.0):
+        dead = [handle.name for handle in handles if not handle.is_alive()]
+        if dead:
+            logger.error(f"Worker(s) {', '.join(dead)} exited, stopping the others")
+            failed = True
+            break
+    if not failed:
+        logger.info("Stop requested, draining workers")
+    stop_event.set()
+
+    deadline = time.monotonic() + shutdown_timeout
+    for handle in handles:
+        handle.join(max(deadline - time.monotonic(), 0))
+        if handle.is_alive():
+            logger.warning(f"Worker {handle.name} did not drain within {shutdown_timeout}s")
+            if isinstance(handle, multiprocessing.process.BaseProcess):
+                handle.kill()
+                handle.join()
+    logger.info("All consumer workers stopped")
+    if failed:
+        raise SystemExit(1)
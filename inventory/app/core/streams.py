@@ -0,0 +1,175 @@
+"""Pending-entry reclaim and dead-lettering for Redis stream consumers.
+
+A message a consumer fails on (or was holding when it crashed) stays in the
+group's pending entries list. PendingReclaimer periodically takes over
+entries idle past a threshold with XAUTOCLAIM and hands them back to the
+consumer's handler; once an entry has been delivered too many times it is
+moved to "<stream>:dlq" together with the last recorded error instead.
+"""
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from inventory.app.core.logging import setup_logging
+from inventory.app.core.metrics import registry
+
+logger = setup_logging("stream-reclaim")
+
+DLQ_SUFFIX = ":dlq"
+
+# Last error per message, kept long enough to outlive every redelivery
+ERROR_KEY_TTL = 24 * 60 * 60  # seconds
+
+RECLAIMED = registry.counter(
+    "consumer_reclaimed_total",
+    "Idle pending entries taken over with XAUTOCLAIM",
+    ("stream",)
+)
+DEAD_LETTERED = registry.counter(
+    "consumer_dead_lettered_total",
+    "Entries moved to the dead-letter stream after too many deliveries",
+    ("stream",)
+)
+
+Message = Tuple[str, dict]
+
+
+def dlq_stream(stream: str) -> str:
+    return f"{stream}{DLQ_SUFFIX}"
+
+
+def error_key(stream: str, message_id: str) -> str:
+    return f"{stream}:error:{message_id}"
+
+
+def record_failure(redis_client, stream: str, message_id: str, error: BaseException) -> None:
+    """Remember why a message failed so it can travel with it to the DLQ"""
+    try:
+        redis_client.set(error_key(stream, message_id), f"{type(error).__name__}: {error}", ex=ERROR_KEY_TTL)
+    except Exception as e:
+        logger.warning(f"Could not record failure for {message_id}: {e}")
+
+
+class PendingReclaimer:
+    """Rate-limited XAUTOCLAIM loop with delivery counting and a DLQ.
+
+    run_if_due() is meant to be called from the consumer's own read loop: it
+    claims at most batch_size entries per interval, so recovering a large
+    backlog left by a crashed consumer cannot starve live traffic.
+    handler(redis_client, messages, stream, group) is the consumer's normal
+    batch handler; on_dead_letter(pipe, fields) may queue extra commands
+    (e.g. a compensating event) in the same pipeline as the DLQ move.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        stream: str,
+        group: str,
+        consumer: str,
+        handler: Callable[..., object],
+        min_idle_ms: int,
+        batch_size: int,
+        interval: float,
+        max_deliveries: int,
+        dlq_maxlen: int,
+        on_dead_letter: Optional[Callable[[object, dict], None]] = None
+    ):
+        self.redis = redis_client
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer
+        self.handler = handler
+        self.min_idle_ms = min_idle_ms
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_deliveries = max_deliveries
+        self.dlq_maxlen = dlq_maxlen
+        self.on_dead_letter = on_dead_letter
+        self._cursor = "0-0"
+        self._next_run = 0.0
+
+    def run_if_due(self) -> int:
+        """Reclaim one batch if the interval has passed; returns entries claimed"""
+        now = time.monotonic()
+        if now < self._next_run:
+            return 0
+        self._next_run = now + self.interval
+        try:
+            return self.run_once()
+        except Exception as e:
+            logger.error(f"Reclaim of {self.stream} failed: {e}", exc_info=True)
+            return 0
+
+    def run_once(self) -> int:
+        """Claim up to batch_size idle entries and process or dead-letter them"""
+        next_cursor, claimed, deleted_ids = self.redis.xautoclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time=self.min_idle_ms,
+            start_id=self._cursor,
+            count=self.batch_size
+        )
+        # Scan the whole PEL across calls, then start over
+        self._cursor = next_cursor
+        if deleted_ids:
+            # Trimmed from the stream while pending; nothing left to process
+            self.redis.xack(self.stream, self.group, *deleted_ids)
+        claimed = [(message_id, fields) for message_id, fields in claimed if fields is not None]
+        if claimed:
+            logger.info(f"Reclaimed {len(claimed)} idle entries from {self.stream}")
+            RECLAIMED.inc(self.stream, amount=len(claimed))
+            self.process(claimed)
+        return len(claimed)
+
+    def delivery_counts(self, messages: List[Message]) -> Dict[str, int]:
+        # One exact-ID lookup per entry: a range would also return other
+        # pending entries between them, and count would cut reclaimed ones off
+        pipe = self.redis.pipeline(transaction=False)
+        for message_id, _ in messages:
+            pipe.xpending_range(self.stream, self.group, min=message_id, max=message_id, count=1)
+        return {
+            entry["message_id"]: entry.get("times_delivered", 1)
+            for entries in pipe.execute()
+            for entry in entries
+        }
+
+    def process(self, messages: List[Message]) -> None:
+        """Dead-letter entries over the delivery limit, hand the rest to the handler"""
+        if not messages:
+            return
+        counts = self.delivery_counts(messages)
+        retry, poison = [], []
+        for message in messages:
+            (poison if counts.get(message[0], 1) > self.max_deliveries else retry).append(message)
+        if poison:
+            self.dead_letter(poison, counts)
+        if retry:
+            self.handler(self.redis, retry, self.stream, self.group)
+
+    def dead_letter(self, messages: List[Message], counts: Dict[str, int]) -> None:
+        errors = self.redis.mget([error_key(self.stream, message_id) for message_id, _ in messages])
+        pipe = self.redis.pipeline(transaction=True)
+        for (message_id, fields), error in zip(messages, errors):
+            logger.warning(
+                f"Moving {self.stream} entry {message_id} to {dlq_stream(self.stream)} "
+                f"after {counts.get(message_id)} deliveries: {error}"
+            )
+            pipe.xadd(
+                dlq_stream(self.stream),
+                {
+                    **fields,
+                    "dlq_source_id": message_id,
+                    "dlq_deliveries": counts.get(message_id, 0),
+                    "dlq_error": error or "unknown",
+                    "dlq_group": self.group
+                },
+                maxlen=self.dlq_maxlen,
+                approximate=True
+            )
+            if self.on_dead_letter is not None:
+                self.on_dead_letter(pipe, fields)
+            pipe.xack(self.stream, self.group, message_id)
+            pipe.delete(error_key(self.stream, message_id))
+        pipe.execute()
+        DEAD_LETTERED.inc(self.stream, amount=len(messages))
@@ -1,14 +1,31 @@
 """Database configuration and session management"""
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from typing import Callable, Optional, TypeVar, Union
+import anyio
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from inventory.app.config import settings
+from inventory.app.core.db import create_db_engine, pool_stats
+from inventory.app.core.metrics import registry
+
+T = TypeVar("T")
+
+# Session type handed to routes: AsyncSession when DATABASE_ASYNC is enabled
+AnySession = Union[Session, AsyncSession]
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync database URL onto its asyncio driver"""
+    scheme, rest = url.split(":", 1)
+    if scheme.split("+")[0] == "sqlite":
+        return f"sqlite+aiosqlite:{rest}"
+    if scheme.split("+")[0] in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg:{rest}"
+    return url
+
 
 # Create engine
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False},
-    echo=settings.debug
-)
+engine = create_db_engine(settings.database_url)
 
 # Create session factory
 SessionLocal = sessionmaker(
@@ -17,17 +34,92 @@ SessionLocal = sessionmaker(
     autoflush=False
 )
 
+# Async engine and session factory, only built in async mode. The sync engine
+# above is still used for init_db, consumers and background workers.
+async_engine = None
+AsyncSessionLocal = None
+if settings.database_async:
+    async_engine = create_db_engine(async_database_url(settings.database_url), is_async=True)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
 # Base class for models
 Base = declarative_base()
 
+_close_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+def _session_close_limiter() -> anyio.CapacityLimiter:
+    """Threads reserved for closing sync sessions.
+
+    Closing is what returns a connection to the pool, so it must not queue
+    behind requests that are themselves blocked waiting for a connection.
+    """
+    global _close_limiter
+    if _close_limiter is None:
+        _close_limiter = anyio.CapacityLimiter(settings.db_pool_size + settings.db_max_overflow)
+    return _close_limiter
+
 
-def get_db():
-    """Dependency injection for database sessions"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def get_db():
+    """Dependency injection for database sessions (async or sync per settings)"""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            if db.in_transaction():
+                await anyio.to_thread.run_sync(db.close, limiter=_session_close_limiter())
+            else:
+                # Never touched the database (e.g. served from a cache): no I/O to wait on
+                db.close()
+
+
+async def run_db(db: AnySession, fn: Callable[..., T], *args, **kwargs) -> T:
+    """Await a sync repository function on either kind of session.
+
+    With an AsyncSession the function runs through run_sync on the asyncio
+    driver without taking a thread; with a Session it runs in the threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+async def close_db():
+    """Dispose the async engine's connection pool, if one was created"""
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+def db_pool_stats() -> dict:
+    """Connection pool stats for the sync engine and, if enabled, the async one"""
+    stats = {"sync": pool_stats(engine)}
+    if async_engine is not None:
+        stats["async"] = pool_stats(async_engine)
+    return stats
+
+
+registry.callback(
+    "db_pool_checked_out",
+    "Database connections currently checked out",
+    "gauge",
+    ("engine",),
+    lambda: [((name,), stats.get("checked_out", 0)) for name, stats in db_pool_stats().items()]
+)
+registry.callback(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up waiting for a database connection",
+    "counter",
+    ("engine",),
+    lambda: [((name,), stats.get("timeouts", 0)) for name, stats in db_pool_stats().items()]
+)
 
 
 def init_db():
@@ -1,11 +1,15 @@
 """FastAPI application entry point"""
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from inventory.app.config import settings
-from inventory.app.database import init_db
+from inventory.app.database import close_db, db_pool_stats, init_db
 from inventory.app.routers import products_router
 from inventory.app.core.logging import setup_logging
+from inventory.app.core.product_cache import product_cache
+from inventory.app.core.redis_client import InstrumentedRedis
+from inventory.app.core.metrics import CONTENT_TYPE, MetricsMiddleware, register_cache_metrics, registry
+from inventory.app.auth.jwt import token_cache
 
 logger = setup_logging("inventory-service")
 
@@ -17,9 +21,28 @@ async def lifespan(app: FastAPI):
     logger.info("Starting inventory service...")
     init_db()
     logger.info("Database initialized successfully")
+    
+    # Redis connection for cache invalidation
+    app.state.redis = InstrumentedRedis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        password=settings.redis_password,
+        decode_responses=True,
+        socket_connect_timeout=5,
+        socket_timeout=5
+    )
+    product_cache.start(app.state.redis)
+    
     yield
-    # Shutdown (if needed in future)
+    
+    # Shutdown - stop cache listener and close Redis connection
     logger.info("Shutting down inventory service...")
+    product_cache.stop()
+    try:
+        app.state.redis.close()
+    except Exception as e:
+        logger.error(f"Error closing Redis connection: {e}")
+    await close_db()
 
 
 app = FastAPI(
@@ -36,8 +59,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=settings.cors_methods,
     allow_headers=settings.cors_headers,
+    expose_headers=["X-Next-Cursor", "X-Missing-Ids"],
 )
 
+# Request metrics (added last so it is outermost and times the whole stack)
+app.add_middleware(MetricsMiddleware)
+
+# Export in-process cache counters on /metrics
+register_cache_metrics({"products": product_cache.products, "listings": product_cache.listings, "jwt": token_cache})
+
 # Include routers
 app.include_router(products_router)
 
@@ -47,3 +77,14 @@ def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": settings.app_name}
 
+
+@app.get("/health/db")
+def database_pool_check():
+    """Connection pool occupancy and checkout wait times"""
+    return db_pool_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
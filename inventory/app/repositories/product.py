@@ -1,8 +1,13 @@
 """Product repository for database operations"""
+from sqlalchemy import case, func, insert, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 from inventory.app.models.product import Product
-from inventory.app.schemas.product import ProductCreate, ProductUpdate
+from inventory.app.schemas.product import ProductCreate, ProductUpdate, ProductUpsert
+
+# Columns that can be requested through field projection
+PRODUCT_FIELDS = ("id", "name", "price", "quantity")
 
 
 def get_all_products(db: Session) -> List[Product]:
@@ -10,11 +15,53 @@ def get_all_products(db: Session) -> List[Product]:
     return db.query(Product).all()
 
 
+def get_products_page(
+    db: Session,
+    limit: int,
+    cursor: Optional[int] = None,
+    name_prefix: Optional[str] = None,
+    fields: Sequence[str] = PRODUCT_FIELDS
+) -> List[dict]:
+    """Get one page of products ordered by ID using keyset pagination.
+
+    Only the requested columns are selected; fields must include "id".
+    The name prefix is matched as a range so the name index can serve it.
+    """
+    query = db.query(*[getattr(Product, field) for field in fields])
+    if cursor is not None:
+        query = query.filter(Product.id > cursor)
+    if name_prefix:
+        query = query.filter(Product.name >= name_prefix, Product.name < name_prefix + "\U0010ffff")
+    return [row._asdict() for row in query.order_by(Product.id).limit(limit)]
+
+
+def iter_product_chunks(db: Session, chunk_size: int) -> Iterator[List[dict]]:
+    """Iterate over every product in ID order, chunk_size rows at a time.
+
+    Rows are fetched with yield_per (a server-side cursor where the driver
+    supports it), so memory use does not grow with the catalog.
+    """
+    stmt = (
+        select(*[getattr(Product, field) for field in PRODUCT_FIELDS])
+        .order_by(Product.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    for rows in db.execute(stmt).partitions():
+        yield [row._asdict() for row in rows]
+
+
 def get_product_by_id(db: Session, product_id: int) -> Optional[Product]:
     """Get product by ID"""
     return db.query(Product).filter(Product.id == product_id).first()
 
 
+def get_products_by_ids(db: Session, product_ids: List[int]) -> List[Product]:
+    """Get all products whose ID is in product_ids"""
+    if not product_ids:
+        return []
+    return db.query(Product).filter(Product.id.in_(product_ids)).all()
+
+
 def create_product(db: Session, product_data: ProductCreate) -> Product:
     """Create a new product"""
     product = Product(**product_data.model_dump())
@@ -24,6 +71,59 @@ def create_product(db: Session, product_data: ProductCreate) -> Product:
     return product
 
 
+def create_products(db: Session, products_data: List[ProductCreate]) -> List[int]:
+    """Create many products in one transaction, returning their IDs in input order.
+
+    Rows are sent as multi-row INSERT ... VALUES ... RETURNING statements,
+    batched only as far as the driver's parameter limit requires.
+    """
+    stmt = insert(Product).returning(Product.id, sort_by_parameter_order=True)
+    product_ids = list(db.scalars(stmt, [product.model_dump() for product in products_data]))
+    db.commit()
+    return product_ids
+
+
+def upsert_products(db: Session, products_data: List[ProductUpsert]) -> List[Tuple[int, bool]]:
+    """Create or replace many products by ID in one transaction.
+
+    Uses INSERT ... ON CONFLICT (id) DO UPDATE on SQLite and PostgreSQL, and
+    a bulk UPDATE of the existing rows plus a bulk INSERT of the rest on
+    other databases. Product IDs must be unique. Returns (id, created) for
+    each item in input order.
+    """
+    product_ids = [product.id for product in products_data]
+    existing = set(db.scalars(select(Product.id).where(Product.id.in_(product_ids))))
+    rows = [product.model_dump() for product in products_data]
+
+    dialect = db.get_bind().dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        # No portable upsert: a row created concurrently fails the INSERT and rolls back the batch
+        updates = [row for row in rows if row["id"] in existing]
+        inserts = [row for row in rows if row["id"] not in existing]
+        if updates:
+            db.execute(update(Product), updates)
+        if inserts:
+            db.execute(insert(Product), inserts)
+        db.commit()
+        return [(product_id, product_id not in existing) for product_id in product_ids]
+
+    insert_stmt = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(Product)
+    stmt = insert_stmt.on_conflict_do_update(
+        index_elements=[Product.id],
+        set_={field: insert_stmt.excluded[field] for field in ("name", "price", "quantity")}
+    )
+    db.execute(stmt, rows)
+
+    if dialect == "postgresql":
+        # Explicit IDs bypass the sequence; move it past them so later inserts don't collide
+        db.execute(
+            text("SELECT setval(pg_get_serial_sequence('products', 'id'), :max_id)"),
+            {"max_id": db.scalar(select(func.max(Product.id)))}
+        )
+    db.commit()
+    return [(product_id, product_id not in existing) for product_id in product_ids]
+
+
 def update_product(db: Session, product_id: int, product_data: ProductUpdate) -> Optional[Product]:
     """Update a product"""
     product = get_product_by_id(db, product_id)
@@ -50,14 +150,48 @@ def delete_product(db: Session, product_id: int) -> bool:
     return True
 
 
-def update_product_quantity(db: Session, product_id: int, quantity_change: int) -> Optional[Product]:
-    """Update product quantity (for order processing)"""
-    product = get_product_by_id(db, product_id)
-    if not product:
-        return None
-    
-    product.quantity += quantity_change
-    db.commit()
-    db.refresh(product)
-    return product
+def reserve_stock(db: Session, product_id: int, quantity: int, commit: bool = True) -> Optional[int]:
+    """Atomically take quantity units of a product if enough are in stock.
+
+    Runs a single conditional UPDATE ... RETURNING, so concurrent consumers
+    can never oversell. Returns the remaining quantity, or None when the
+    product does not exist or has insufficient stock.
+    """
+    stmt = (
+        update(Product)
+        .where(Product.id == product_id, Product.quantity >= quantity)
+        .values(quantity=Product.quantity - quantity)
+        .returning(Product.quantity)
+        .execution_options(synchronize_session="fetch")
+    )
+    remaining = db.execute(stmt).scalar_one_or_none()
+    if commit:
+        db.commit()
+    return remaining
+
+
+def reserve_stock_bulk(db: Session, items: List[Tuple[int, int]], commit: bool = True) -> Dict[int, int]:
+    """Atomically take stock for many (product_id, quantity) pairs in one statement.
+
+    Each pair succeeds or fails on its own. Product IDs must be unique.
+    Returns the remaining quantity for every product that was reserved;
+    products missing from the result were not found or had insufficient stock.
+    """
+    if not items:
+        return {}
+    quantities = dict(items)
+    if len(quantities) != len(items):
+        raise ValueError("Product IDs must be unique within a bulk reservation")
 
+    requested = case(quantities, value=Product.id)
+    stmt = (
+        update(Product)
+        .where(Product.id.in_(quantities), Product.quantity >= requested)
+        .values(quantity=Product.quantity - requested)
+        .returning(Product.id, Product.quantity)
+        .execution_options(synchronize_session="fetch")
+    )
+    reserved = {product_id: remaining for product_id, remaining in db.execute(stmt)}
+    if commit:
+        db.commit()
+    return reserved
@@ -1,31 +1,134 @@
 """Product API routes"""
-from typing import List, Annotated
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from inventory.app.schemas.product import ProductCreate, ProductUpdate, ProductResponse
-from inventory.app.database import get_db
+import csv
+import io
+import json
+from typing import Iterator, List, Annotated, Literal, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from inventory.app.schemas.product import (
+    ProductCreate,
+    ProductUpdate,
+    ProductFields,
+    ProductResponse,
+    ProductBulkCreate,
+    ProductBulkUpsert,
+    ProductBulkResult,
+)
+from inventory.app.config import settings
+from inventory.app.database import AnySession, get_db, run_db, SessionLocal
 from inventory.app.repositories import product as product_repo
 from inventory.app.auth.oauth2 import admin_required, authenticated_user
+from inventory.app.core.product_cache import product_cache
 
 router = APIRouter(prefix="/products", tags=["products"])
 
 
-@router.get("", response_model=List[ProductResponse], dependencies=[Depends(authenticated_user)])
-def get_all_products(
-    db: Annotated[Session, Depends(get_db)]
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """Parse a comma-separated fields= projection; the ID is always included"""
+    if not fields:
+        return product_repo.PRODUCT_FIELDS
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(product_repo.PRODUCT_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    requested.add("id")
+    return tuple(field for field in product_repo.PRODUCT_FIELDS if field in requested)
+
+
+def parse_ids(ids: str) -> List[int]:
+    """Parse a comma-separated ids= list, dropping duplicates but keeping order"""
+    try:
+        product_ids = list(dict.fromkeys(int(product_id) for product_id in ids.split(",") if product_id.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="ids must be a comma-separated list of integers"
+        )
+    if len(product_ids) > settings.products_multi_get_max_ids:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {settings.products_multi_get_max_ids} ids are allowed per request"
+        )
+    return product_ids
+
+
+@router.get(
+    "",
+    response_model=List[ProductFields],
+    response_model_exclude_unset=True,
+    dependencies=[Depends(authenticated_user)]
+)
+async def get_all_products(
+    response: Response,
+    db: Annotated[AnySession, Depends(get_db)],
+    cursor: Annotated[Optional[int], Query(description="Return products with an ID greater than this")] = None,
+    limit: Annotated[int, Query(ge=1, le=settings.products_max_page_size)] = settings.products_page_size,
+    fields: Annotated[Optional[str], Query(description="Comma-separated fields to return")] = None,
+    name_prefix: Annotated[Optional[str], Query(min_length=1, max_length=255)] = None,
+    ids: Annotated[Optional[str], Query(description="Comma-separated product IDs to fetch")] = None
 ):
-    """Get all products"""
-    products = product_repo.get_all_products(db)
+    """Get a page of products ordered by ID, or specific products with ids=.
+
+    When the page is full, the X-Next-Cursor header holds the cursor for the next page.
+    With ids=, products come back in the requested order and the X-Missing-Ids
+    header lists the IDs that do not exist; paging parameters are ignored.
+    """
+    selected = set(parse_fields(fields))
+    if ids is not None:
+        product_ids = parse_ids(ids)
+        found = await run_db(db, product_cache.get_products, product_ids)
+        missing = [str(product_id) for product_id in product_ids if product_id not in found]
+        response.headers["X-Missing-Ids"] = ",".join(missing)
+        return [found[product_id].model_dump(include=selected) for product_id in product_ids if product_id in found]
+
+    products = await run_db(db, product_cache.get_products_page, limit, cursor, name_prefix, parse_fields(fields))
+    if len(products) == limit:
+        response.headers["X-Next-Cursor"] = str(products[-1]["id"])
     return products
 
 
+def stream_products(export_format: str) -> Iterator[str]:
+    """Yield the whole catalog as NDJSON or CSV, one chunk of rows at a time"""
+    # The request's session is closed before the body is streamed, so use our own
+    db = SessionLocal()
+    try:
+        if export_format == "csv":
+            yield ",".join(product_repo.PRODUCT_FIELDS) + "\r\n"
+        for rows in product_repo.iter_product_chunks(db, settings.products_export_chunk_size):
+            if export_format == "csv":
+                buffer = io.StringIO()
+                csv.DictWriter(buffer, fieldnames=product_repo.PRODUCT_FIELDS).writerows(rows)
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(row) + "\n" for row in rows)
+    finally:
+        db.close()
+
+
+@router.get("/export", dependencies=[Depends(authenticated_user)])
+def export_products(
+    export_format: Annotated[Literal["ndjson", "csv"], Query(alias="format")] = "ndjson"
+):
+    """Stream the full product catalog as NDJSON (default) or CSV"""
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_products(export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="products.{export_format}"'}
+    )
+
+
 @router.get("/{product_id}", response_model=ProductResponse, dependencies=[Depends(authenticated_user)])
-def get_product(
+async def get_product(
     product_id: int,
-    db: Annotated[Session, Depends(get_db)]
+    db: Annotated[AnySession, Depends(get_db)]
 ):
     """Get a product by ID"""
-    product = product_repo.get_product_by_id(db, product_id)
+    product = await run_db(db, product_cache.get_product, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -35,42 +138,73 @@ def get_product(
 
 
 @router.post("", response_model=ProductResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(admin_required)])
-def create_product(
+async def create_product(
     product_data: ProductCreate,
-    db: Annotated[Session, Depends(get_db)]
+    db: Annotated[AnySession, Depends(get_db)]
 ):
     """Create a new product"""
-    product = product_repo.create_product(db, product_data)
+    product = await run_db(db, product_repo.create_product, product_data)
+    await run_in_threadpool(product_cache.invalidate, product.id)
     return product
 
 
+@router.post("/bulk", response_model=List[ProductBulkResult], status_code=status.HTTP_201_CREATED, dependencies=[Depends(admin_required)])
+async def create_products(
+    bulk_data: ProductBulkCreate,
+    db: Annotated[AnySession, Depends(get_db)]
+):
+    """Create many products in one statement and transaction"""
+    product_ids = await run_db(db, product_repo.create_products, bulk_data.items)
+    await run_in_threadpool(product_cache.invalidate, *product_ids)
+    return [
+        ProductBulkResult(index=index, id=product_id, status="created")
+        for index, product_id in enumerate(product_ids)
+    ]
+
+
+@router.put("/bulk", response_model=List[ProductBulkResult], dependencies=[Depends(admin_required)])
+async def upsert_products(
+    bulk_data: ProductBulkUpsert,
+    db: Annotated[AnySession, Depends(get_db)]
+):
+    """Create or replace many products by ID in one statement and transaction"""
+    results = await run_db(db, product_repo.upsert_products, bulk_data.items)
+    await run_in_threadpool(product_cache.invalidate, *[product_id for product_id, _ in results])
+    return [
+        ProductBulkResult(index=index, id=product_id, status="created" if created else "updated")
+        for index, (product_id, created) in enumerate(results)
+    ]
+
+
 @router.put("/{product_id}", response_model=ProductResponse, dependencies=[Depends(admin_required)])
-def update_product(
+async def update_product(
     product_id: int,
     product_data: ProductUpdate,
-    db: Annotated[Session, Depends(get_db)]
+    db: Annotated[AnySession, Depends(get_db)]
 ):
     """Update a product"""
-    product = product_repo.update_product(db, product_id, product_data)
+    product = await run_db(db, product_repo.update_product, product_id, product_data)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
+    await run_in_threadpool(product_cache.invalidate, product_id)
     return product
 
 
 @router.delete("/{product_id}", dependencies=[Depends(admin_required)])
-def delete_product(
+async def delete_product(
     product_id: int,
-    db: Annotated[Session, Depends(get_db)]
+    db: Annotated[AnySession, Depends(get_db)]
 ):
     """Delete a product"""
-    success = product_repo.delete_product(db, product_id)
+    success = await run_db(db, product_repo.delete_product, product_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
+    await run_in_threadpool(product_cache.invalidate, product_id)
     return {"message": "Product deleted successfully"}
 
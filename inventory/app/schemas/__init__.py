@@ -1,5 +1,22 @@
 """Pydantic schemas"""
-from inventory.app.schemas.product import ProductCreate, ProductUpdate, ProductResponse
-
-__all__ = ["ProductCreate", "ProductUpdate", "ProductResponse"]
+from inventory.app.schemas.product import (
+    ProductCreate,
+    ProductUpsert,
+    ProductUpdate,
+    ProductFields,
+    ProductResponse,
+    ProductBulkCreate,
+    ProductBulkUpsert,
+    ProductBulkResult,
+)
 
+__all__ = [
+    "ProductCreate",
+    "ProductUpsert",
+    "ProductUpdate",
+    "ProductFields",
+    "ProductResponse",
+    "ProductBulkCreate",
+    "ProductBulkUpsert",
+    "ProductBulkResult",
+]
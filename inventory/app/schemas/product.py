@@ -1,6 +1,8 @@
 """Product Pydantic schemas"""
-from pydantic import BaseModel, Field
-from typing import Optional
+from collections import Counter
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Literal, Optional
+from inventory.app.config import settings
 
 
 class ProductBase(BaseModel):
@@ -15,6 +17,11 @@ class ProductCreate(ProductBase):
     pass
 
 
+class ProductUpsert(ProductCreate):
+    """Schema for creating or replacing a product by ID"""
+    id: int = Field(..., gt=0)
+
+
 class ProductUpdate(BaseModel):
     """Schema for updating a product"""
     name: Optional[str] = Field(None, min_length=1, max_length=255)
@@ -22,9 +29,42 @@ class ProductUpdate(BaseModel):
     quantity: Optional[int] = Field(None, ge=0)
 
 
+class ProductFields(BaseModel):
+    """Schema for a product listing item limited to the requested fields"""
+    id: int
+    name: Optional[str] = None
+    price: Optional[float] = None
+    quantity: Optional[int] = None
+
+
 class ProductResponse(ProductBase):
     """Schema for product response"""
     id: int
     
     model_config = {"from_attributes": True}
 
+
+class ProductBulkCreate(BaseModel):
+    """Schema for creating many products in one request"""
+    items: List[ProductCreate] = Field(..., min_length=1, max_length=settings.products_bulk_max_items)
+
+
+class ProductBulkUpsert(BaseModel):
+    """Schema for creating or replacing many products by ID in one request"""
+    items: List[ProductUpsert] = Field(..., min_length=1, max_length=settings.products_bulk_max_items)
+
+    @field_validator("items")
+    @classmethod
+    def ids_must_be_unique(cls, items: List[ProductUpsert]) -> List[ProductUpsert]:
+        counts = Counter(item.id for item in items)
+        duplicates = sorted(product_id for product_id, count in counts.items() if count > 1)
+        if duplicates:
+            raise ValueError(f"Duplicate product IDs: {duplicates}")
+        return items
+
+
+class ProductBulkResult(BaseModel):
+    """Schema for the outcome of one item in a bulk request"""
+    index: int
+    id: int
+    status: Literal["created", "updated"]
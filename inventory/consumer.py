@@ -1,145 +1,493 @@
 """Consumer service for processing order completion events"""
+import asyncio
+import functools
 import time
-import socket
 import redis
+import redis.asyncio
 from inventory.app.database import SessionLocal, init_db
 from inventory.app.repositories import product as product_repo
 from inventory.app.config import settings
 from inventory.app.core.logging import setup_logging
+from inventory.app.core.product_cache import publish_invalidation
+from inventory.app.core.metrics import registry
+from inventory.app.core.consumer_metrics import MESSAGES, record_batch, watch_stream
+from inventory.app.core.async_consumer import AsyncStreamConsumer, stop_when_set
+from inventory.app.core.dedupe import BUSY, PROCESSED, DedupeStore
+from inventory.app.core.runner import run_workers
+from inventory.app.core.streams import PendingReclaimer, record_failure
 
 # Setup logging
 logger = setup_logging("inventory-consumer")
 IDEMPOTENCY_KEY = "processed:inventory:orders"
+dedupe = DedupeStore(
+    IDEMPOTENCY_KEY,
+    settings.dedupe_mode,
+    retention=settings.dedupe_retention_seconds,
+    bucket_seconds=settings.dedupe_bucket_seconds,
+    bloom_capacity=settings.dedupe_bloom_capacity,
+    bloom_error_rate=settings.dedupe_bloom_error_rate,
+    claim_seconds=settings.dedupe_claim_seconds
+)
+
+REFUNDS = registry.counter(
+    "consumer_refunds_total",
+    "Refund events emitted to refund_order, by reason",
+    ("reason",)
+)
+
+def dedupe_key(message_id: str, order_data: dict) -> str:
+    """Idempotency key for a message.
+
+    Events relayed from the payment outbox carry an event_id that survives
+    republishing; anything else falls back to the stream message ID.
+    """
+    return order_data.get('event_id') or message_id
+
+
+def batch_keys(messages: list) -> list:
+    """Distinct idempotency keys of a batch, in order"""
+    return list(dict.fromkeys(dedupe_key(*message) for message in messages))
+
+
+def split_claimed(messages: list, outcomes: dict) -> tuple:
+    """Split a batch into (pending messages, skipped IDs, busy IDs).
+
+    outcomes maps each key from batch_keys() to its dedupe claim outcome.
+    A repeat of an event_id within the batch is skipped too, so a replayed
+    outbox batch cannot apply twice even when it lands in one read. Busy
+    messages are held by another batch or worker; they are not acked, so
+    the reclaimer retries them once the holder has finished.
+    """
+    pending, skipped_ids, busy_ids, applied_keys = [], [], [], set()
+    for message in messages:
+        message_key = dedupe_key(*message)
+        outcome = outcomes[message_key]
+        if outcome == BUSY:
+            busy_ids.append(message[0])
+        elif outcome == PROCESSED or message_key in applied_keys:
+            skipped_ids.append(message[0])
+        else:
+            pending.append(message)
+            applied_keys.add(message_key)
+    return pending, skipped_ids, busy_ids
+
+
+def log_claim_outcomes(key: str, skipped_ids: list, busy_ids: list) -> None:
+    if skipped_ids:
+        logger.info(f"Skipping {len(skipped_ids)} already processed messages")
+    if busy_ids:
+        logger.info(f"Leaving {len(busy_ids)} messages pending, claimed by another consumer")
+        MESSAGES.inc(key, "busy", amount=len(busy_ids))
+
 
 def process_order(redis_client, order_data: dict, message_id: str, key: str, group: str) -> bool:
-    # Idempotency check
-    if redis_client.sismember(IDEMPOTENCY_KEY, message_id):
+    """Process a single order completion event. Returns True if successful."""
+    message_key = dedupe_key(message_id, order_data)
+    # Idempotency check; the claim keeps a concurrent copy from applying too
+    token, (outcome,) = dedupe.claim(redis_client, [message_key])
+    if outcome == PROCESSED:
         logger.info(
             "Skipping already processed message",
             extra={"message_id": message_id}
         )
+        dedupe.release(redis_client, [message_key], token)
         redis_client.xack(key, group, message_id)
+        MESSAGES.inc(key, "skipped")
+        return True
+    if outcome == BUSY:
+        # Not acked: the reclaimer retries it once the holder has finished
+        logger.info(
+            "Leaving message pending, claimed by another consumer",
+            extra={"message_id": message_id}
+        )
+        MESSAGES.inc(key, "busy")
         return True
     
-    """Process a single order completion event. Returns True if successful."""
     db = SessionLocal()
     try:
         product_id = int(order_data['product_id'])
         quantity = int(order_data['quantity'])
         
-        # Get product first to check availability
-        product = product_repo.get_product_by_id(db, product_id)
-        
-        if not product:
-            # Product not found, send to refund queue
-            logger.warning(f"Product {product_id} not found, sending to refund")
-            redis_client.xadd('refund_order', order_data, '*')
-            redis_client.sadd(IDEMPOTENCY_KEY, message_id)
-            redis_client.xack(key, group, message_id)
-            return True
+        # Check availability and take the stock in one conditional update
+        remaining = product_repo.reserve_stock(db, product_id, quantity)
         
-        # Check if we have sufficient quantity BEFORE updating
-        if product.quantity < quantity:
-            # Insufficient stock, send to refund queue without updating
+        if remaining is None:
+            # Product not found or insufficient stock, send to refund queue
             logger.warning(
-                f"Product {product_id} has insufficient stock: {product.quantity} available, "
-                f"{quantity} requested. Sending to refund"
+                f"Product {product_id} not found or has insufficient stock for {quantity} units. "
+                f"Sending to refund"
             )
             redis_client.xadd('refund_order', order_data, '*')
-            redis_client.sadd(IDEMPOTENCY_KEY, message_id)
+            dedupe.mark(redis_client, [message_key])
+            dedupe.release(redis_client, [message_key], token)
             redis_client.xack(key, group, message_id)
+            REFUNDS.inc("insufficient_stock")
+            MESSAGES.inc(key, "processed")
             return True
         
-        # Sufficient stock available, proceed with update
-        product = product_repo.update_product_quantity(db, product_id, -quantity)
-        
-        logger.info(f"Product {product_id} quantity updated: {product.quantity} (reduced by {quantity})")
+        logger.info(f"Product {product_id} quantity updated: {remaining} (reduced by {quantity})")
         
-        redis_client.sadd(IDEMPOTENCY_KEY, message_id)
+        publish_invalidation(redis_client, [product_id])
+        dedupe.mark(redis_client, [message_key])
+        dedupe.release(redis_client, [message_key], token)
         redis_client.xack(key, group, message_id)
+        MESSAGES.inc(key, "processed")
         return True
         
     except Exception as e:
+        # Leave the message pending: the reclaimer retries it and, after
+        # CONSUMER_MAX_DELIVERIES attempts, dead-letters and refunds it
         logger.error(f"Error processing order {message_id}: {str(e)}", exc_info=True)
         db.rollback()
-        redis_client.xadd('refund_order', order_data, '*')
-        redis_client.xack(key, group, message_id)
+        dedupe.release(redis_client, [message_key], token)
+        record_failure(redis_client, key, message_id, e)
+        MESSAGES.inc(key, "failed")
         return False
     finally:
         db.close()
 
 
-def consume_orders() -> None:
-    """Main consumer loop for processing order completion events"""
-    logger.info("Starting inventory consumer service")
-    
-    # Initialize database tables before starting consumer
-    logger.info("Initializing database...")
-    init_db()
-    logger.info("Database initialized successfully")
-    
-    redis_client = redis.Redis(
+def reserve_orders(pending: list) -> tuple:
+    """Take stock for a batch of orders in a single DB transaction.
+
+    Returns (refunds, updated_products): refunds is a list of
+    (order_data, reason) for orders that could not be filled. Raises, after
+    rolling back, if the transaction fails.
+    """
+    refunds = []
+    updated_products = set()
+    db = SessionLocal()
+    try:
+        orders = []
+        for message_id, order_data in pending:
+            try:
+                orders.append((message_id, order_data, int(order_data['product_id']), int(order_data['quantity'])))
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"Malformed order message {message_id}, sending to refund")
+                refunds.append((order_data, "malformed"))
+
+        # Reserve in waves so each bulk statement touches a product at most once;
+        # repeated orders for the same product see the stock left by earlier ones
+        while orders:
+            wave, deferred, seen_products = [], [], set()
+            for order in orders:
+                (deferred if order[2] in seen_products else wave).append(order)
+                seen_products.add(order[2])
+
+            reserved = product_repo.reserve_stock_bulk(
+                db, [(product_id, quantity) for _, _, product_id, quantity in wave], commit=False
+            )
+            updated_products.update(reserved)
+            for message_id, order_data, product_id, quantity in wave:
+                if product_id not in reserved:
+                    logger.warning(
+                        f"Product {product_id} not found or has insufficient stock for {quantity} units. "
+                        f"Sending to refund"
+                    )
+                    refunds.append((order_data, "insufficient_stock"))
+            orders = deferred
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return refunds, updated_products
+
+
+def process_batch(redis_client, messages: list, key: str, group: str) -> int:
+    """Process a batch of order completion events in a single DB transaction.
+
+    Idempotency claims, refunds and acks are each sent to Redis in one round
+    trip. Returns the number of messages that were applied or refunded.
+    """
+    if not messages:
+        return 0
+
+    keys = batch_keys(messages)
+    token, outcomes = dedupe.claim(redis_client, keys)
+    pending, skipped_ids, busy_ids = split_claimed(messages, dict(zip(keys, outcomes)))
+    log_claim_outcomes(key, skipped_ids, busy_ids)
+    busy = set(busy_ids)
+    done_ids = [message_id for message_id, _ in messages if message_id not in busy]
+
+    try:
+        refunds, updated_products = reserve_orders(pending)
+    except Exception as e:
+        # Fall back to the per-message path so one bad order can't fail the batch;
+        # it claims each message itself, so give up the batch's claims first
+        logger.error(f"Error processing batch, retrying per message: {str(e)}", exc_info=True)
+        dedupe.release(redis_client, keys, token)
+        for message_id, order_data in pending:
+            process_order(redis_client, order_data, message_id, key, group)
+        if skipped_ids:
+            redis_client.xack(key, group, *skipped_ids)
+            MESSAGES.inc(key, "skipped", amount=len(skipped_ids))
+        return len(pending)
+
+    pipe = redis_client.pipeline(transaction=False)
+    for order_data, _ in refunds:
+        pipe.xadd('refund_order', order_data, '*')
+    publish_invalidation(pipe, updated_products)
+    dedupe.mark(pipe, [dedupe_key(*message) for message in pending])
+    dedupe.release(pipe, keys, token)
+    if done_ids:
+        pipe.xack(key, group, *done_ids)
+    pipe.execute()
+
+    for _, reason in refunds:
+        REFUNDS.inc(reason)
+    MESSAGES.inc(key, "processed", amount=len(pending))
+    MESSAGES.inc(key, "skipped", amount=len(skipped_ids))
+    logger.info(f"Processed batch of {len(pending)} orders ({len(refunds)} refunded)")
+    return len(pending)
+
+
+def handle_messages(redis_client, messages: list, key: str, group: str) -> None:
+    """Dispatch messages to the batch or per-message path depending on settings"""
+    start = time.perf_counter()
+    if settings.consumer_batch_mode:
+        process_batch(redis_client, messages, key, group)
+    else:
+        for message_id, order_data in messages:
+            process_order(redis_client, order_data, message_id, key, group)
+    record_batch(key, len(messages), time.perf_counter() - start)
+
+
+async def handle_messages_async(redis_client, messages: list, sync_client, key: str, group: str) -> list:
+    """Batch handler for the asyncio engine; returns the message IDs to ack.
+
+    Same steps as process_batch, but Redis round trips go through the async
+    client and the DB transaction runs on a worker thread. Acks are left to
+    the engine, which coalesces them across concurrent batches.
+    """
+    keys = batch_keys(messages)
+    token, outcomes = await dedupe.claim_async(redis_client, keys)
+    pending, skipped_ids, busy_ids = split_claimed(messages, dict(zip(keys, outcomes)))
+    log_claim_outcomes(key, skipped_ids, busy_ids)
+    MESSAGES.inc(key, "skipped", amount=len(skipped_ids))
+    busy = set(busy_ids)
+    done_ids = [message_id for message_id, _ in messages if message_id not in busy]
+
+    try:
+        refunds, updated_products = await asyncio.to_thread(reserve_orders, pending)
+    except Exception as e:
+        # Fall back to the per-message path, which claims and acks what it
+        # processes itself, so give up the batch's claims first
+        logger.error(f"Error processing batch, retrying per message: {str(e)}", exc_info=True)
+        pipe = redis_client.pipeline(transaction=False)
+        dedupe.release(pipe, keys, token)
+        await pipe.execute()
+        for message_id, order_data in pending:
+            await asyncio.to_thread(process_order, sync_client, order_data, message_id, key, group)
+        return skipped_ids
+
+    pipe = redis_client.pipeline(transaction=False)
+    for order_data, _ in refunds:
+        pipe.xadd('refund_order', order_data, '*')
+    publish_invalidation(pipe, updated_products)
+    dedupe.mark(pipe, [dedupe_key(*message) for message in pending])
+    dedupe.release(pipe, keys, token)
+    await pipe.execute()
+
+    for _, reason in refunds:
+        REFUNDS.inc(reason)
+    MESSAGES.inc(key, "processed", amount=len(pending))
+    logger.info(f"Processed batch of {len(pending)} orders ({len(refunds)} refunded)")
+    return done_ids
+
+
+def refund_dead_letter(pipe, order_data: dict) -> None:
+    """Refund an order whose completion event is being dead-lettered"""
+    pipe.xadd('refund_order', order_data, '*')
+    REFUNDS.inc("dead_letter")
+
+
+STREAM_KEY = 'order_completed'
+GROUP = 'inventory-group'
+
+
+def create_redis_client() -> redis.Redis:
+    return redis.Redis(
         host=settings.redis_host,
         port=settings.redis_port,
         password=settings.redis_password,
         decode_responses=True
     )
 
-    key = 'order_completed'
-    group = 'inventory-group'
-    # Use hostname as consumer name for identification
-    consumer_name = socket.gethostname()
 
-    try:
-        redis_client.xgroup_create(
-            name=key,
-            groupname=group,
-            id="0",
-            mkstream=True
-        )
-        logger.info(f"Created consumer group '{group}' for stream '{key}'")
-    except Exception:
-        logger.info(f"Consumer group '{group}' already exists")
+def create_async_redis_client() -> redis.asyncio.Redis:
+    return redis.asyncio.Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        password=settings.redis_password,
+        decode_responses=True
+    )
 
-    logger.info(f"Consumer '{consumer_name}' started for group '{group}' on stream '{key}'")
-    
-    # First, try to read any existing undelivered messages from the beginning
-    # This handles the case where messages existed before the consumer group was created
+
+def create_reclaimer(redis_client, consumer_name: str) -> PendingReclaimer:
+    return PendingReclaimer(
+        redis_client,
+        STREAM_KEY,
+        GROUP,
+        consumer_name,
+        handle_messages,
+        min_idle_ms=settings.consumer_reclaim_min_idle_ms,
+        batch_size=settings.consumer_reclaim_batch_size,
+        interval=settings.consumer_reclaim_interval,
+        max_deliveries=settings.consumer_max_deliveries,
+        dlq_maxlen=settings.consumer_dlq_maxlen,
+        on_dead_letter=refund_dead_letter
+    )
+
+
+def recover_pending(redis_client, reclaimer: PendingReclaimer, consumer_name: str) -> None:
+    """Retry this consumer's own pending messages from a previous run.
+
+    They go through the reclaimer so a message that crashed us is dead-lettered
+    rather than retried forever; other consumers' entries are reclaimed later.
+    """
     try:
         initial_results = redis_client.xreadgroup(
-            groupname=group,
+            groupname=GROUP,
             consumername=consumer_name,
-            streams={key: "0"},
+            streams={STREAM_KEY: "0"},
             count=100
         )
         if initial_results:
             for stream, messages in initial_results:
                 logger.info(f"Found {len(messages)} existing undelivered messages to process")
-                for message_id, order_data in messages:
-                    process_order(redis_client, order_data, message_id, key, group)
+                reclaimer.process(messages)
     except Exception as e:
         logger.error(f"Error reading initial messages: {str(e)}", exc_info=True)
 
+
+def consume_worker(consumer_name: str, stop_event) -> None:
+    """Consumer loop for one worker; returns once stop_event is set.
+
+    The event is only checked between batches, so a batch that has been
+    read is always processed and acked before the worker exits.
+    """
+    key = STREAM_KEY
+    group = GROUP
+    # Each worker has its own Redis connections; DB sessions come from this
+    # process's engine pool, one per batch
+    redis_client = create_redis_client()
+    watch_stream(redis_client, key, group)
+    reclaimer = create_reclaimer(redis_client, consumer_name)
+
+    logger.info(f"Consumer '{consumer_name}' started for group '{group}' on stream '{key}'")
+    recover_pending(redis_client, reclaimer, consumer_name)
+
     logger.info("Starting to consume messages from Redis stream")
-    while True:
+    while not stop_event.is_set():
         try:
             results = redis_client.xreadgroup(
                 groupname=group,
                 consumername=consumer_name,
                 streams={key: ">"},
-                count=10,
-                block=5000
+                count=settings.consumer_batch_size,
+                block=settings.consumer_block_ms
             )
 
             if results:
                 for stream, messages in results:
-                    for message_id, order_data in messages:
-                        process_order(redis_client, order_data, message_id, key, group)
+                    handle_messages(redis_client, messages, key, group)
+
+            # Between reads, take over entries abandoned by failed or dead consumers
+            reclaimer.run_if_due()
 
         except Exception as e:
             logger.error(f"Consumer error: {str(e)}", exc_info=True)
+            results = None
         
-        time.sleep(1)
+        # Keep draining without pausing while the stream has a backlog
+        if not results:
+            stop_event.wait(1)
+
+    redis_client.close()
+    logger.info(f"Consumer '{consumer_name}' stopped")
+
+
+async def consume_async(consumer_name: str, stop_event) -> None:
+    """asyncio engine loop for one worker; returns once stop_event is set"""
+    key = STREAM_KEY
+    group = GROUP
+    # The sync client serves metrics scrapes, the reclaimer and the
+    # per-message fallback; the hot path uses the async one
+    redis_client = create_redis_client()
+    async_client = create_async_redis_client()
+    watch_stream(redis_client, key, group)
+    reclaimer = create_reclaimer(redis_client, consumer_name)
+
+    logger.info(f"Async consumer '{consumer_name}' started for group '{group}' on stream '{key}'")
+    await asyncio.to_thread(recover_pending, redis_client, reclaimer, consumer_name)
+
+    engine = AsyncStreamConsumer(
+        async_client,
+        key,
+        group,
+        consumer_name,
+        functools.partial(handle_messages_async, sync_client=redis_client, key=key, group=group),
+        batch_size=settings.consumer_batch_size,
+        block_ms=settings.consumer_block_ms,
+        concurrency=settings.consumer_concurrency,
+        reclaimer=reclaimer
+    )
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(stop_when_set(stop_event, stop))
+    try:
+        await engine.run(stop)
+    finally:
+        watcher.cancel()
+        await async_client.aclose()
+        redis_client.close()
+    logger.info(f"Consumer '{consumer_name}' stopped")
+
+
+def consume_worker_async(consumer_name: str, stop_event) -> None:
+    """Runner entry point for the asyncio engine"""
+    asyncio.run(consume_async(consumer_name, stop_event))
+
+
+CONSUMER_ENGINES = {"sync": consume_worker, "asyncio": consume_worker_async}
+
+
+def consume_orders() -> None:
+    """Prepare the stream and run CONSUMER_WORKERS consumer workers"""
+    logger.info("Starting inventory consumer service")
+    
+    # Initialize database tables before starting consumer
+    logger.info("Initializing database...")
+    init_db()
+    logger.info("Database initialized successfully")
+    
+    redis_client = create_redis_client()
+    try:
+        redis_client.xgroup_create(
+            name=STREAM_KEY,
+            groupname=GROUP,
+            id="0",
+            mkstream=True
+        )
+        logger.info(f"Created consumer group '{GROUP}' for stream '{STREAM_KEY}'")
+    except Exception:
+        logger.info(f"Consumer group '{GROUP}' already exists")
+    finally:
+        redis_client.close()
+
+    if settings.consumer_engine not in CONSUMER_ENGINES:
+        raise ValueError(
+            f"Unknown consumer engine {settings.consumer_engine!r}, expected one of {tuple(CONSUMER_ENGINES)}"
+        )
+    run_workers(
+        CONSUMER_ENGINES[settings.consumer_engine],
+        settings.consumer_workers,
+        settings.consumer_worker_mode,
+        settings.consumer_shutdown_timeout,
+        settings.consumer_metrics_port
+    )
 
 
 if __name__ == "__main__":
@@ -1,6 +1,11 @@
-
+import hashlib
+import time
 from jose import JWTError, jwt
 from payment.app.config import settings
+from payment.app.core.cache import TTLCache
+
+# Verified claims keyed by token digest; entries never outlive the token's exp
+token_cache = TTLCache(settings.jwt_cache_max_size, settings.JWT_EXPIRE_MINUTES * 60)
 
 def verify_token(token: str, credentials_exception) -> dict:
     """Verify JWT token and return payload"""
@@ -15,4 +20,20 @@ def verify_token(token: str, credentials_exception) -> dict:
         
         return payload
     except (JWTError, ValueError, TypeError):
-        raise credentials_exception
\ No newline at end of file
+        raise credentials_exception
+
+
+def verify_token_cached(token: str, credentials_exception) -> dict:
+    """Verify JWT token, reusing the claims of a token verified earlier"""
+    if not settings.jwt_cache_enabled:
+        return verify_token(token, credentials_exception)
+
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = verify_token(token, credentials_exception)
+        exp = payload.get("exp")
+        ttl = exp - time.time() if isinstance(exp, (int, float)) else None
+        if ttl is None or ttl > 0:
+            token_cache.set(key, payload, ttl)
+    return dict(payload)
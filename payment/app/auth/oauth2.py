@@ -11,7 +11,15 @@ def get_current_user(token: HTTPAuthorizationCredentials = Depends(security)) ->
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    return jwt.verify_token(token.credentials, credentials_exception)
+    return jwt.verify_token_cached(token.credentials, credentials_exception)
+
+def admin_required(user: dict = Depends(get_current_user)):
+    if user.get("role") != "ADMIN":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return user
 
 def user_required(user: dict = Depends(get_current_user)):
     if user.get("role") != "USER":
@@ -19,4 +27,15 @@ def user_required(user: dict = Depends(get_current_user)):
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User access required"
         )
-    return user
\ No newline at end of file
+    return user
+
+def current_user_id(user: dict = Depends(user_required)) -> int:
+    """ID of the calling user, from the token's sub claim"""
+    try:
+        return int(user["sub"])
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
\ No newline at end of file
@@ -0,0 +1,4 @@
+"""Clients for other services"""
+from payment.app.clients import inventory
+
+__all__ = ["inventory"]
@@ -0,0 +1,99 @@
+"""Inventory service HTTP client"""
+import time
+from typing import Dict, List
+import httpx
+from fastapi import HTTPException, status
+from payment.app.config import settings
+from payment.app.core.metrics import registry
+
+INVENTORY_REQUEST_SECONDS = registry.histogram(
+    "inventory_request_duration_seconds",
+    "Outbound inventory service call latency by operation and status",
+    ("operation", "status")
+)
+
+
+def create_inventory_client() -> httpx.AsyncClient:
+    """Create the pooled client shared by the whole app (one per process)"""
+    return httpx.AsyncClient(
+        base_url=settings.inventory_service_url,
+        http2=settings.inventory_http2,
+        limits=httpx.Limits(
+            max_connections=settings.inventory_max_connections,
+            max_keepalive_connections=settings.inventory_max_keepalive_connections,
+            keepalive_expiry=settings.inventory_keepalive_expiry
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.inventory_connect_timeout,
+            read=settings.inventory_read_timeout,
+            write=settings.inventory_write_timeout,
+            pool=settings.inventory_pool_timeout
+        )
+    )
+
+
+async def _get(client: httpx.AsyncClient, operation: str, url: str, **kwargs) -> httpx.Response:
+    """GET from the inventory service, recording latency ("error" if no response)"""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        response = await client.get(url, **kwargs)
+        outcome = str(response.status_code)
+        return response
+    finally:
+        INVENTORY_REQUEST_SECONDS.observe(time.perf_counter() - start, operation, outcome)
+
+
+async def fetch_product(client: httpx.AsyncClient, product_id: int, authorization: str) -> dict:
+    """Fetch a product from the inventory service, forwarding the caller's JWT"""
+    try:
+        response = await _get(
+            client,
+            "get_product",
+            f"/products/{product_id}",
+            headers={"Authorization": authorization}
+        )
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product not found: {e.response.status_code}"
+        )
+    except httpx.HTTPError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Inventory service unavailable: {str(e)}"
+        )
+    return response.json()
+
+
+async def fetch_products(client: httpx.AsyncClient, product_ids: List[int], authorization: str) -> Dict[int, dict]:
+    """Fetch several products with one inventory multi-get, keyed by product ID"""
+    unique_ids = list(dict.fromkeys(product_ids))
+    try:
+        response = await _get(
+            client,
+            "get_products",
+            "/products",
+            params={"ids": ",".join(str(product_id) for product_id in unique_ids)},
+            headers={"Authorization": authorization}
+        )
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Inventory lookup failed: {e.response.status_code}"
+        )
+    except httpx.HTTPError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Inventory service unavailable: {str(e)}"
+        )
+
+    missing = response.headers.get("X-Missing-Ids")
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Products not found: {missing}"
+        )
+    return {product["id"]: product for product in response.json()}
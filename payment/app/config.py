@@ -14,6 +14,18 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = "sqlite:///./payment.db"
+    database_async: bool = False
+    # 20 + 20 matches the AnyIO threadpool (40 threads) that sync routes run on
+    db_pool_size: int = 20
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0  # seconds
+    db_pool_recycle: int = 1800  # seconds, server databases only
+    db_pool_pre_ping: bool = True  # server databases only
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size: int = 268435456  # 256 MiB
     
     # CORS
     cors_origins: List[str] = ["http://localhost:3000"]
@@ -27,6 +39,36 @@ class Settings(BaseSettings):
     
     # External Services
     inventory_service_url: str = "http://localhost:8000"
+    inventory_http2: bool = False
+    inventory_max_connections: int = 100
+    inventory_max_keepalive_connections: int = 20
+    inventory_keepalive_expiry: float = 30.0  # seconds
+    inventory_connect_timeout: float = 2.0  # seconds
+    inventory_read_timeout: float = 5.0  # seconds
+    inventory_write_timeout: float = 5.0  # seconds
+    inventory_pool_timeout: float = 2.0  # seconds
+    
+    # Processed-message dedupe for the consumers
+    dedupe_mode: str = "buckets"  # "buckets", "keys" or "bloom" (see app/core/dedupe.py)
+    dedupe_retention_seconds: int = 86400  # must outlast redelivery; entries dead-letter well before
+    dedupe_bucket_seconds: int = 3600
+    dedupe_bloom_capacity: int = 100000  # IDs per bucket at the target error rate
+    dedupe_bloom_error_rate: float = 0.001
+    
+    # Consumer
+    consumer_engine: str = "sync"  # "sync" or "asyncio"
+    consumer_concurrency: int = 4  # batches in flight per worker, asyncio engine only
+    consumer_batch_size: int = 10
+    consumer_block_ms: int = 5000
+    consumer_workers: int = 1
+    consumer_worker_mode: str = "thread"  # "thread" or "process" (one core each)
+    consumer_shutdown_timeout: float = 30.0  # seconds to drain on SIGTERM
+    consumer_metrics_port: int = 9101  # 0 disables the metrics server
+    consumer_reclaim_min_idle_ms: int = 60000  # pending this long counts as abandoned
+    consumer_reclaim_batch_size: int = 50
+    consumer_reclaim_interval: float = 5.0  # seconds between reclaim batches
+    consumer_max_deliveries: int = 5  # then the entry goes to <stream>:dlq
+    consumer_dlq_maxlen: int = 100000
     
     # Application
     app_name: str = "Payment Service"
@@ -35,11 +77,37 @@ class Settings(BaseSettings):
     
     # Order Processing
     order_completion_delay: int = 5  # seconds
+    order_batch_max_items: int = 50
+    orders_page_size: int = 100
+    orders_max_page_size: int = 1000
+    scheduler_batch_size: int = 100
+    scheduler_poll_interval: float = 0.5  # seconds
+    scheduler_lease_seconds: int = 30
+    scheduler_sweep_interval: float = 60.0  # seconds; reschedules pending orders whose job was never stored
+    
+    # Outbox relay (order_completed events)
+    outbox_batch_size: int = 500
+    outbox_poll_interval: float = 1.0  # seconds; completions also wake the relay directly
+    outbox_lock_ttl_ms: int = 10000  # one relay publishes at a time across API replicas
+    outbox_retention_seconds: int = 86400  # published rows are purged after this
+    outbox_purge_interval: float = 300.0  # seconds
+    
+    # Order read cache (GET /orders/{id})
+    order_cache_enabled: bool = True
+    order_cache_max_size: int = 10000
+    order_cache_ttl: float = 30.0  # seconds; status changes are pushed, this bounds missed ones
+    
+    # Order status streams (GET /orders/{id}/events)
+    order_events_keepalive: float = 15.0  # seconds between SSE comments on an idle stream
+    order_events_max_seconds: float = 300.0  # streams end after this; EventSource reconnects
+    order_events_health_check_interval: float = 30.0  # seconds; PINGs the idle subscription
     
     # JWT
     JWT_SECRET: str = "super-secret-key"
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRE_MINUTES: int = 60
+    jwt_cache_enabled: bool = True
+    jwt_cache_max_size: int = 10000
 
 settings = Settings()
 
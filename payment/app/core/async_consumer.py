@@ -0,0 +1,144 @@
+"""Asyncio stream consumer engine built on redis.asyncio.
+
+The sync consumer loop reads a batch, processes it, acks it and only then
+reads again. AsyncStreamConsumer keeps up to `concurrency` batches in
+flight: the next XREADGROUP is issued while earlier batches are still being
+handled, a semaphore bounds how many handlers run at once, and acks from all
+of them are coalesced into one XACK per round trip.
+
+A handler is `async def handler(redis_client, messages) -> ids to ack`.
+IDs it does not return stay pending, so the reclaimer retries them; a
+handler that raises leaves its whole batch pending the same way. The
+reclaimer itself is sync and rare, so it runs on a worker thread.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Iterable, List, Optional, Set, Tuple
+
+from payment.app.core.consumer_metrics import record_batch
+from payment.app.core.logging import setup_logging
+from payment.app.core.streams import PendingReclaimer
+
+logger = setup_logging("async-consumer")
+
+Message = Tuple[str, dict]
+AsyncHandler = Callable[[object, List[Message]], Awaitable[Iterable[str]]]
+
+# Upper bound on message IDs sent in a single XACK
+MAX_ACK_BATCH = 1000
+
+
+class AsyncStreamConsumer:
+    """Read, handle and ack one stream for one consumer name"""
+
+    def __init__(
+        self,
+        redis_client,
+        stream: str,
+        group: str,
+        consumer: str,
+        handler: AsyncHandler,
+        batch_size: int,
+        block_ms: int,
+        concurrency: int,
+        reclaimer: Optional[PendingReclaimer] = None
+    ):
+        self.redis = redis_client
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer
+        self.handler = handler
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.concurrency = max(concurrency, 1)
+        self.reclaimer = reclaimer
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._acks: asyncio.Queue = asyncio.Queue()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Consume until stop is set, then finish in-flight batches and flush acks"""
+        acker = asyncio.create_task(self._ack_loop())
+        background = [acker]
+        if self.reclaimer is not None:
+            background.append(asyncio.create_task(self._reclaim_loop(stop)))
+        try:
+            await self._read_loop(stop)
+        finally:
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            await self._acks.join()
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+
+    async def _read_loop(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            # Only read another batch when a handler slot is free, so prefetch
+            # overlaps processing without piling up unacked messages
+            await self._slots.acquire()
+            try:
+                results = await self.redis.xreadgroup(
+                    groupname=self.group,
+                    consumername=self.consumer,
+                    streams={self.stream: ">"},
+                    count=self.batch_size,
+                    block=self.block_ms
+                )
+            except Exception as e:
+                self._slots.release()
+                logger.error(f"Consumer error: {str(e)}", exc_info=True)
+                await asyncio.sleep(1)
+                continue
+
+            messages = [message for _, stream_messages in results or [] for message in stream_messages]
+            if not messages:
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._handle(messages))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _handle(self, messages: List[Message]) -> None:
+        start = time.perf_counter()
+        try:
+            ack_ids = list(await self.handler(self.redis, messages))
+        except Exception as e:
+            logger.error(f"Error handling batch of {len(messages)} messages: {str(e)}", exc_info=True)
+            return
+        finally:
+            self._slots.release()
+        record_batch(self.stream, len(messages), time.perf_counter() - start)
+        for message_id in ack_ids:
+            self._acks.put_nowait(message_id)
+
+    async def _ack_loop(self) -> None:
+        while True:
+            ids = [await self._acks.get()]
+            while len(ids) < MAX_ACK_BATCH and not self._acks.empty():
+                ids.append(self._acks.get_nowait())
+            try:
+                await self.redis.xack(self.stream, self.group, *ids)
+            except Exception as e:
+                # Unacked entries stay pending; the reclaimer redelivers them and
+                # the idempotency check turns the redelivery into an ack
+                logger.error(f"Failed to ack {len(ids)} messages: {str(e)}")
+            finally:
+                for _ in ids:
+                    self._acks.task_done()
+
+    async def _reclaim_loop(self, stop: asyncio.Event) -> None:
+        # Take over entries abandoned by failed or dead consumers
+        while not stop.is_set():
+            await asyncio.to_thread(self.reclaimer.run_if_due)
+            try:
+                await asyncio.wait_for(stop.wait(), self.reclaimer.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def stop_when_set(stop_event, stop: asyncio.Event, interval: float = 0.2) -> None:
+    """Bridge a thread/process stop event from the runner into an asyncio.Event"""
+    while not stop_event.is_set():
+        await asyncio.sleep(interval)
+    stop.set()
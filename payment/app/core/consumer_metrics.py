@@ -0,0 +1,192 @@
+"""Redis stream consumer metrics: backlog, lag, throughput and timings.
+
+Consumers run outside FastAPI, so they serve the shared registry from a small
+threaded HTTP server instead of the /metrics route. Backlog figures (XLEN,
+XPENDING, XINFO GROUPS lag) are read from Redis when scraped rather than
+polled, so an idle consumer costs nothing.
+"""
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from payment.app.core.logging import setup_logging
+from payment.app.core.metrics import CONTENT_TYPE, DEFAULT_BUCKETS, registry
+
+logger = setup_logging("consumer-metrics")
+
+# Batches can run far longer than a single API call when the DB is contended
+BATCH_BUCKETS = DEFAULT_BUCKETS + (30.0, 60.0)
+
+# Throughput gauge window, for autoscalers that read a value instead of rate()
+THROUGHPUT_WINDOW_SECONDS = 60.0
+
+# Scrapes within this many seconds reuse the last Redis read
+BACKLOG_CACHE_SECONDS = 1.0
+
+MESSAGES = registry.counter(
+    "consumer_messages_total",
+    "Stream messages handled, by outcome (processed, skipped, failed, ...)",
+    ("stream", "outcome")
+)
+MESSAGE_SECONDS = registry.histogram(
+    "consumer_message_processing_seconds",
+    "Processing time per message; batch time divided by batch size in batch mode",
+    ("stream",)
+)
+BATCH_SECONDS = registry.histogram(
+    "consumer_batch_processing_seconds",
+    "Processing time per batch read with XREADGROUP",
+    ("stream",),
+    BATCH_BUCKETS
+)
+
+
+class ThroughputWindow:
+    """Messages per second over a sliding window"""
+
+    def __init__(self, window: float = THROUGHPUT_WINDOW_SECONDS):
+        self.window = window
+        self.started = time.monotonic()
+        self.last_processed: Optional[float] = None
+        self._events: deque = deque()
+        self._lock = threading.Lock()
+
+    def add(self, count: int) -> None:
+        with self._lock:
+            self._events.append((time.monotonic(), count))
+            self.last_processed = time.time()
+
+    def rate(self) -> float:
+        now = time.monotonic()
+        with self._lock:
+            while self._events and self._events[0][0] < now - self.window:
+                self._events.popleft()
+            total = sum(count for _, count in self._events)
+        return total / max(min(self.window, now - self.started), 1.0)
+
+
+_watched: Dict[Tuple[str, str], object] = {}
+_throughput: Dict[str, ThroughputWindow] = {}
+_backlog: Dict[Tuple[str, str], dict] = {}
+_backlog_read_at = 0.0
+_backlog_lock = threading.Lock()
+
+
+def watch_stream(redis_client, stream: str, group: str) -> None:
+    """Export backlog and lag for a stream/group read by this process"""
+    _watched[(stream, group)] = redis_client
+    _throughput.setdefault(stream, ThroughputWindow())
+
+
+def record_batch(stream: str, count: int, seconds: float) -> None:
+    """Record one handled batch of count messages that took seconds"""
+    if not count:
+        return
+    BATCH_SECONDS.observe(seconds, stream)
+    per_message = seconds / count
+    for _ in range(count):
+        MESSAGE_SECONDS.observe(per_message, stream)
+    _throughput.setdefault(stream, ThroughputWindow()).add(count)
+
+
+def _read_backlog(redis_client, stream: str, group: str) -> dict:
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.xlen(stream)
+    pipe.xpending(stream, group)
+    pipe.xinfo_groups(stream)
+    length, pending, groups = pipe.execute()
+    state = {"length": length, "pending": pending["pending"], "lag": None, "oldest_pending_age": 0.0}
+    if pending["pending"] and pending["min"]:
+        # Stream IDs start with their creation time in milliseconds
+        oldest_ms = int(str(pending["min"]).split("-")[0])
+        state["oldest_pending_age"] = max(time.time() - oldest_ms / 1000, 0.0)
+    for info in groups:
+        if info.get("name") == group:
+            # lag is None when Redis cannot compute it (e.g. after XDEL/trim)
+            state["lag"] = info.get("lag")
+    return state
+
+
+def _backlog_states() -> Dict[Tuple[str, str], dict]:
+    global _backlog_read_at
+    with _backlog_lock:
+        if time.monotonic() - _backlog_read_at > BACKLOG_CACHE_SECONDS:
+            states = {}
+            for (stream, group), redis_client in list(_watched.items()):
+                try:
+                    states[(stream, group)] = _read_backlog(redis_client, stream, group)
+                except Exception as e:
+                    logger.warning(f"Could not read backlog for {stream}/{group}: {e}")
+            _backlog.clear()
+            _backlog.update(states)
+            _backlog_read_at = time.monotonic()
+        return dict(_backlog)
+
+
+def _collect(field: str) -> Iterable[Tuple[Tuple[str, ...], float]]:
+    samples: List[Tuple[Tuple[str, ...], float]] = []
+    for (stream, group), state in _backlog_states().items():
+        if state[field] is not None:
+            samples.append(((stream, group), state[field]))
+    return samples
+
+
+registry.callback(
+    "consumer_stream_length", "Entries in the stream (XLEN)", "gauge",
+    ("stream", "group"), lambda: _collect("length")
+)
+registry.callback(
+    "consumer_pending_messages", "Delivered but unacknowledged entries (XPENDING)", "gauge",
+    ("stream", "group"), lambda: _collect("pending")
+)
+registry.callback(
+    "consumer_group_lag", "Entries not yet delivered to the group (XINFO GROUPS lag)", "gauge",
+    ("stream", "group"), lambda: _collect("lag")
+)
+registry.callback(
+    "consumer_oldest_pending_age_seconds", "Age of the oldest unacknowledged entry", "gauge",
+    ("stream", "group"), lambda: _collect("oldest_pending_age")
+)
+registry.callback(
+    "consumer_throughput_messages_per_second", f"Messages handled per second over the last {THROUGHPUT_WINDOW_SECONDS:.0f}s",
+    "gauge", ("stream",), lambda: [((stream,), window.rate()) for stream, window in list(_throughput.items())]
+)
+registry.callback(
+    "consumer_last_processed_timestamp_seconds", "Unix time the last batch finished; stalls show as a growing gap",
+    "gauge", ("stream",),
+    lambda: [((stream,), window.last_processed) for stream, window in list(_throughput.items()) if window.last_processed]
+)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body, content_type = registry.render().encode(), CONTENT_TYPE
+        elif path == "/health":
+            body, content_type = b'{"status": "healthy"}', "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # Scrapes every few seconds would drown the consumer's own log lines
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics and /health on a daemon thread; port 0 disables it"""
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="consumer-metrics", daemon=True).start()
+    logger.info(f"Consumer metrics listening on {host}:{port}")
+    return server
@@ -0,0 +1,138 @@
+"""Engine factory: SQLite pragmas, pool tuning and checkout wait stats"""
+import threading
+import time
+from typing import Dict, Union
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from payment.app.config import settings
+from payment.app.core.metrics import DB_CHECKOUT_SECONDS
+
+
+class CheckoutStats:
+    """Running totals of how long connection checkouts waited on the pool"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_max": self.wait_seconds_max
+            }
+
+
+class _TimedCheckout:
+    """Pool mixin timing connect(), i.e. queue wait plus any new connection"""
+
+    engine_label = "sync"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = CheckoutStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.checkout_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        wait = time.perf_counter() - start
+        self.checkout_stats.record(wait)
+        DB_CHECKOUT_SECONDS.observe(wait, self.engine_label)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    engine_label = "async"
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        # Negative cache_size is in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kib)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(url: str, is_async: bool = False) -> Union[Engine, AsyncEngine]:
+    """Build an engine for url with the pool and SQLite settings from Settings.
+
+    SQLite connections get WAL, synchronous, busy_timeout, cache_size and
+    mmap_size pragmas on connect so the API and consumer processes sharing a
+    database file do not lock each other out. File databases of any backend
+    use a QueuePool sized by DB_POOL_SIZE/DB_MAX_OVERFLOW; recycle and
+    pre-ping apply to server databases only.
+    """
+    parsed = make_url(url)
+    is_sqlite = parsed.get_backend_name() == "sqlite"
+    kwargs = {"echo": settings.debug}
+
+    if not _is_memory_sqlite(parsed):
+        kwargs.update(
+            poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout
+        )
+    if is_sqlite:
+        if not is_async:
+            kwargs["connect_args"] = {"check_same_thread": False}
+    else:
+        kwargs.update(
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping
+        )
+
+    engine = create_async_engine(url, **kwargs) if is_async else create_engine(url, **kwargs)
+    if is_sqlite:
+        event.listen(engine.sync_engine if is_async else engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+def pool_stats(engine: Union[Engine, AsyncEngine]) -> Dict[str, float]:
+    """Pool occupancy and checkout wait totals for an engine"""
+    if isinstance(engine, AsyncEngine):
+        engine = engine.sync_engine
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0)
+        )
+    checkout_stats = getattr(pool, "checkout_stats", None)
+    if checkout_stats is not None:
+        stats.update(checkout_stats.snapshot())
+    return stats
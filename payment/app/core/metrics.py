@@ -0,0 +1,346 @@
+"""Low-overhead in-process metrics with Prometheus text exposition.
+
+Every metric keeps one shard per writing thread, so threads never contend
+with each other when recording: a shard's lock is only ever contended by a
+scrape, which takes it briefly to read a consistent copy. When a thread
+exits (threadpool workers come and go), its shard is folded into retired
+totals, so the number of shards is bounded by the number of live threads.
+"""
+import itertools
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; tuned for API handlers and the DB/Redis/HTTP calls they make
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Shard:
+    """One thread's values, owned by that thread's thread-local"""
+
+    __slots__ = ("values", "lock", "__weakref__")
+
+    def __init__(self):
+        self.values: dict = {}
+        self.lock = threading.Lock()
+
+
+class _ShardedMetric:
+    """Base for metrics written through per-thread shards"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Live shards' values and locks, keyed by shard number; the _Shard
+        # itself is only referenced by its thread, so it dies with it
+        self._live: Dict[int, Tuple[dict, threading.Lock]] = {}
+        self._retired: dict = {}
+        self._keys = itertools.count()
+        self._shards_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                key = next(self._keys)
+                self._live[key] = (shard.values, shard.lock)
+            weakref.finalize(shard, self._retire, key).atexit = False
+            return shard
+
+    def _retire(self, key: int) -> None:
+        """Fold the shard of a thread that has exited into the retired totals"""
+        with self._shards_lock:
+            values, _ = self._live.pop(key)
+            self._merge(self._retired, values)
+
+    def _totals(self) -> dict:
+        """Retired totals plus a consistent copy of every live shard"""
+        totals: dict = {}
+        with self._shards_lock:
+            self._merge(totals, self._retired)
+            for values, lock in self._live.values():
+                with lock:
+                    self._merge(totals, values)
+        return totals
+
+    def shard_count(self) -> int:
+        return len(self._live)
+
+    def _merge(self, totals: dict, values: dict) -> None:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_ShardedMetric):
+    """Monotonic counter"""
+
+    kind = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        shard = self._shard()
+        values = shard.values
+        with shard.lock:
+            values[labelvalues] = values.get(labelvalues, 0) + amount
+
+    def _merge(self, totals: Dict[LabelValues, float], values: Dict[LabelValues, float]) -> None:
+        for key, value in values.items():
+            totals[key] = totals.get(key, 0) + value
+
+    def render(self) -> List[str]:
+        totals: Dict[LabelValues, float] = self._totals()
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in sorted(totals.items())]
+
+
+class Gauge(Counter):
+    """Up/down gauge; per-thread increments and decrements are summed"""
+
+    kind = "gauge"
+
+    def dec(self, *labelvalues: str, amount: float = 1) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+
+class Histogram(_ShardedMetric):
+    """Bucketed distribution with sum and count"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        shard = self._shard()
+        bucket = bisect_left(self.buckets, value)
+        with shard.lock:
+            # [per-bucket counts..., +Inf count, sum, count]; bucket counts are not cumulative here
+            entry = shard.values.get(labelvalues)
+            if entry is None:
+                entry = shard.values[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            entry[bucket] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def time(self, *labelvalues: str) -> "_Timer":
+        """Context manager observing the elapsed wall time of its block"""
+        return _Timer(self, labelvalues)
+
+    def _merge(self, totals: Dict[LabelValues, list], values: Dict[LabelValues, list]) -> None:
+        for key, entry in values.items():
+            total = totals.get(key)
+            if total is None:
+                totals[key] = list(entry)
+            else:
+                for i, value in enumerate(entry):
+                    total[i] += value
+
+    def render(self) -> List[str]:
+        totals: Dict[LabelValues, list] = self._totals()
+        lines = []
+        bounds = [_number(bound) for bound in self.buckets] + ["+Inf"]
+        for key, entry in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, entry):
+                cumulative += count
+                le = 'le="' + bound + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(entry[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {entry[-1]}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labelvalues", "start")
+
+    def __init__(self, histogram: Histogram, labelvalues: LabelValues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+
+
+class CallbackMetric:
+    """Metric whose samples are read from a function at scrape time.
+
+    Used to export state that is already tracked elsewhere (pool occupancy,
+    cache counters) without recording it twice.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Iterable[Tuple[LabelValues, float]]]
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in self.collect()]
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together on /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Iterable[Tuple[LabelValues, float]]]
+    ) -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, kind, labelnames, collect))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status",
+    ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled"
+)
+DB_CHECKOUT_SECONDS = registry.histogram(
+    "db_pool_checkout_seconds",
+    "Time to check a connection out of the database pool",
+    ("engine",)
+)
+
+
+def register_cache_metrics(caches: Dict[str, object]) -> None:
+    """Export the counters of named TTLCaches (anything with a stats() dict)"""
+
+    def collect(stat: str):
+        return lambda: [((name,), cache.stats()[stat]) for name, cache in caches.items()]
+
+    registry.callback("cache_entries", "Entries held per in-process cache", "gauge", ("cache",), collect("size"))
+    for stat in ("hits", "misses", "evictions"):
+        registry.callback(f"cache_{stat}_total", f"In-process cache {stat}", "counter", ("cache",), collect(stat))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and in-flight requests.
+
+    Requests are labelled by route template (e.g. /products/{product_id}) so
+    the label set stays bounded; unmatched paths are grouped together.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # The router stores the matched route in the shared scope dict
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code)
+            )
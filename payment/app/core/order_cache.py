@@ -0,0 +1,90 @@
+"""Order read cache with ETags"""
+import threading
+from typing import Iterable, NamedTuple, Optional, Tuple
+from sqlalchemy.orm import Session
+from payment.app.config import settings
+from payment.app.core.cache import TTLCache
+from payment.app.models.order import OrderStatus
+from payment.app.repositories import order as order_repo
+from payment.app.schemas.order import OrderResponse
+
+
+class CachedOrder(NamedTuple):
+    order: OrderResponse
+    etag: str
+    body: bytes
+
+
+def order_etag(order_id: int, status: str) -> str:
+    """Weak ETag; the status is the only field of an order that changes"""
+    return f'W/"{order_id}-{status}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check using weak comparison, as RFC 9110 requires"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def _cached(order: OrderResponse) -> CachedOrder:
+    return CachedOrder(order, order_etag(order.id, order.status.value), order.model_dump_json().encode())
+
+
+class OrderCache:
+    """Serialized orders keyed by ID, served with their ETag.
+
+    Status changes published by the scheduler and the payment consumer are
+    applied to cached entries in place (by the order event hub), so pollers
+    see the new status without a DB read; the TTL only bounds staleness if a
+    message is lost.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.orders = TTLCache(max_size, ttl)
+        # load() runs in the threadpool while apply() runs on the event loop
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def get(self, order_id: int) -> Optional[CachedOrder]:
+        """Cached order, without touching the database"""
+        if not settings.order_cache_enabled:
+            return None
+        return self.orders.get(order_id)
+
+    def load(self, db: Session, order_id: int) -> Optional[CachedOrder]:
+        """Read an order from the database and cache it"""
+        generation = self._generation
+        order = order_repo.get_order_by_id(db, order_id)
+        if not order:
+            return None
+        cached = _cached(OrderResponse.model_validate(order))
+        # Skip the fill if a status change raced with the read
+        with self._lock:
+            if settings.order_cache_enabled and generation == self._generation:
+                self.orders.set(order_id, cached)
+        return cached
+
+    def apply(self, changes: Iterable[Tuple[int, str]]) -> None:
+        """Update the status of cached orders"""
+        with self._lock:
+            self._generation += 1
+            for order_id, status in changes:
+                # Not a lookup for a client, so not counted as a hit or miss
+                cached = self.orders.peek(order_id)
+                if cached is not None and cached.order.status != status:
+                    self.orders.set(order_id, _cached(cached.order.model_copy(update={"status": OrderStatus(status)})))
+
+    def drop_all(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.orders.clear()
+
+    def stats(self) -> dict:
+        return self.orders.stats()
+
+
+order_cache = OrderCache(settings.order_cache_max_size, settings.order_cache_ttl)
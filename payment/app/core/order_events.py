@@ -0,0 +1,150 @@
+"""Order status change fan-out over Redis pub/sub.
+
+The scheduler and the payment consumer publish every status change on
+payment:orders:changed. Each API process holds a single subscription to it
+(OrderEventHub): changes are applied to the order cache first and then
+handed to the asyncio queues of clients streaming GET /orders/{id}/events,
+so a waiting client costs an idle coroutine rather than a poll loop. After
+the subscription is lost and restored, the watched orders are re-read from
+the database, since changes published in between were never received.
+"""
+import asyncio
+import contextlib
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from redis.asyncio import ConnectionPool, Redis
+from payment.app.config import settings
+from payment.app.core.logging import setup_logging
+from payment.app.core.order_cache import CachedOrder, order_cache
+from payment.app.database import run_db_new_session
+
+logger = setup_logging("payment-order-events")
+
+# Messages are comma-separated "<order id>:<status>" pairs
+CHANGES_CHANNEL = "payment:orders:changed"
+
+
+def publish_status_changes(redis_client, changes: Iterable[Tuple[int, str]]) -> None:
+    """Tell every API replica about new order statuses.
+
+    redis_client may be a pipeline, in which case the publish is sent with it.
+    """
+    message = ",".join(f"{order_id}:{status}" for order_id, status in changes)
+    if message:
+        redis_client.publish(CHANGES_CHANNEL, message)
+
+
+def parse_changes(data: str) -> Iterator[Tuple[int, str]]:
+    for change in data.split(","):
+        order_id, status = change.split(":", 1)
+        yield int(order_id), status
+
+
+def subscriber_client(redis_client) -> Redis:
+    """Client of its own for the subscription, reaching the same server.
+
+    Its connections PING when idle for the health check interval, so a dead
+    one raises instead of going quiet.
+    """
+    pool = redis_client.connection_pool
+    return Redis.from_pool(ConnectionPool(
+        connection_class=pool.connection_class,
+        **dict(pool.connection_kwargs, health_check_interval=settings.order_events_health_check_interval)
+    ))
+
+
+def _load_orders(db, order_ids: List[int]) -> List[Optional[CachedOrder]]:
+    return [order_cache.load(db, order_id) for order_id in order_ids]
+
+
+class OrderEventHub:
+    """One pub/sub subscription per process, fanned out to per-order waiters"""
+
+    def __init__(self):
+        self._waiters: Dict[int, Set[asyncio.Queue]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    @contextlib.contextmanager
+    def listen(self, order_id: int) -> Iterator[asyncio.Queue]:
+        """Queue receiving the new status of order_id while the block runs"""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._waiters.setdefault(order_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            waiters = self._waiters.get(order_id)
+            if waiters is not None:
+                waiters.discard(queue)
+                if not waiters:
+                    del self._waiters[order_id]
+
+    def dispatch(self, changes: Iterable[Tuple[int, str]]) -> None:
+        """Update the cache, then wake the clients waiting on these orders"""
+        changes = list(changes)
+        order_cache.apply(changes)
+        for order_id, status in changes:
+            for queue in self._waiters.get(order_id, ()):
+                queue.put_nowait(status)
+
+    def listener_count(self) -> int:
+        # Called from the /metrics thread while the loop may be mutating the dict
+        return sum(len(waiters) for waiters in list(self._waiters.values()))
+
+    async def refresh_waiters(self) -> None:
+        """Re-read the orders clients are waiting on and wake them with it"""
+        order_ids = list(self._waiters)
+        if not order_ids:
+            return
+        orders = await run_db_new_session(_load_orders, order_ids)
+        for order_id, cached in zip(order_ids, orders):
+            if cached is not None:
+                for queue in self._waiters.get(order_id, ()):
+                    queue.put_nowait(cached.order.status.value)
+
+    async def _listen(self, redis_client) -> None:
+        subscriber = subscriber_client(redis_client)
+        missed = False
+        try:
+            while True:
+                try:
+                    async with subscriber.pubsub(ignore_subscribe_messages=True) as pubsub:
+                        await pubsub.subscribe(CHANGES_CHANNEL)
+                        if missed:
+                            # Subscribed again, so any change after this read is published
+                            # to us; messages wait on the socket until it has been pushed
+                            await self.refresh_waiters()
+                            missed = False
+                        while True:
+                            # listen() would read under the client's socket_timeout, and
+                            # a quiet channel is not a lost connection
+                            message = await pubsub.get_message(
+                                ignore_subscribe_messages=True,
+                                timeout=settings.order_events_health_check_interval
+                            )
+                            if message is not None and message["type"] == "message":
+                                self.dispatch(parse_changes(message["data"]))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Changes may have been missed while disconnected
+                    logger.warning(f"Order change listener error: {e}")
+                    order_cache.drop_all()
+                    missed = True
+                    await asyncio.sleep(1.0)
+        finally:
+            await subscriber.aclose()
+
+    def start(self, redis_client) -> None:
+        """Start receiving status changes published on redis_client"""
+        self._listener = asyncio.create_task(self._listen(redis_client))
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+order_events = OrderEventHub()
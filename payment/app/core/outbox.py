@@ -0,0 +1,156 @@
+"""Relay from the outbox table to Redis streams.
+
+Order changes write their events to outbox_events in the same transaction,
+so an event exists if and only if the change was committed. The relay
+publishes unpublished rows in batches with one pipelined XADD round trip,
+then stamps them published with a single UPDATE. A crash between the two
+republishes the batch; every event carries an `event_id` that consumers
+deduplicate on, so the replay is harmless.
+
+Only one relay publishes at a time across API replicas (a Redis lease), so
+events leave in outbox order.
+"""
+import asyncio
+import time
+import uuid
+from typing import List, Tuple
+from fastapi.concurrency import run_in_threadpool
+from payment.app.config import settings
+from payment.app.core.logging import setup_logging
+from payment.app.core.metrics import registry
+from payment.app.database import SessionLocal
+from payment.app.repositories import outbox as outbox_repo
+
+logger = setup_logging("payment-outbox")
+
+LOCK_KEY = "lock:payment:outbox_relay"
+
+# Extend the lease only if we still hold it
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+PUBLISHED = registry.counter(
+    "outbox_events_published_total",
+    "Outbox events relayed to Redis streams",
+    ("stream",)
+)
+
+Event = Tuple[int, str, dict]
+
+
+def event_id(row_id: int, created_at: float) -> str:
+    """Stream-ID-shaped identifier, so dedupe stores can bucket it by time"""
+    return f"{int(created_at * 1000)}-{row_id}"
+
+
+def fetch_unpublished(limit: int) -> List[Event]:
+    """Load the next batch as (row id, stream, fields) tuples"""
+    db = SessionLocal()
+    try:
+        return [
+            (event.id, event.stream, {**event.payload, "event_id": event_id(event.id, event.created_at)})
+            for event in outbox_repo.get_unpublished(db, limit)
+        ]
+    finally:
+        db.close()
+
+
+def mark_published(event_ids: List[int]) -> None:
+    db = SessionLocal()
+    try:
+        outbox_repo.mark_published(db, event_ids)
+    finally:
+        db.close()
+
+
+def purge_published(before: float) -> int:
+    db = SessionLocal()
+    try:
+        return outbox_repo.purge_published(db, before)
+    finally:
+        db.close()
+
+
+class OutboxRelay:
+    """asyncio worker that drains the outbox into Redis streams"""
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self._renew = redis_client.register_script(RENEW_SCRIPT)
+        self._token = uuid.uuid4().hex
+        self._wakeup = asyncio.Event()
+        self._next_purge = 0.0
+        self._task = None
+
+    def notify(self) -> None:
+        """Publish now rather than at the next poll (called after commits)"""
+        self._wakeup.set()
+
+    async def _hold_lease(self) -> bool:
+        ttl = settings.outbox_lock_ttl_ms
+        if await self.redis.set(LOCK_KEY, self._token, nx=True, px=ttl):
+            return True
+        return bool(await self._renew(keys=[LOCK_KEY], args=[self._token, ttl]))
+
+    async def run_once(self) -> int:
+        """Publish one batch. Returns the number of events published."""
+        if not await self._hold_lease():
+            return 0
+        events = await run_in_threadpool(fetch_unpublished, settings.outbox_batch_size)
+        if not events:
+            return 0
+
+        pipe = self.redis.pipeline(transaction=False)
+        for _, stream, fields in events:
+            pipe.xadd(stream, fields, '*')
+        await pipe.execute()
+        await run_in_threadpool(mark_published, [row_id for row_id, _, _ in events])
+
+        for _, stream, _ in events:
+            PUBLISHED.inc(stream)
+        logger.info(f"Published {len(events)} outbox events")
+        return len(events)
+
+    async def purge_if_due(self) -> None:
+        now = time.monotonic()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + settings.outbox_purge_interval
+        purged = await run_in_threadpool(purge_published, time.time() - settings.outbox_retention_seconds)
+        if purged:
+            logger.info(f"Purged {purged} published outbox events")
+
+    async def run(self) -> None:
+        """Worker loop; drains back-to-back while full batches are waiting"""
+        while True:
+            self._wakeup.clear()
+            try:
+                published = await self.run_once()
+                await self.purge_if_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Rows stay unpublished and are retried; requests are unaffected
+                logger.error(f"Outbox relay error: {str(e)}", exc_info=True)
+                published = 0
+
+            if published < settings.outbox_batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), settings.outbox_poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,27 @@
+"""Async Redis client that records per-command latency"""
+import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+from payment.app.core.metrics import registry
+
+REDIS_COMMAND_SECONDS = registry.histogram(
+    "redis_command_duration_seconds",
+    "Redis round-trip latency by command (pipelines as PIPELINE)",
+    ("command",)
+)
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        with REDIS_COMMAND_SECONDS.time("PIPELINE"):
+            return await super().execute(raise_on_error)
+
+
+class InstrumentedRedis(redis.Redis):
+    """redis.asyncio.Redis timing every command and pipeline it sends"""
+
+    async def execute_command(self, *args, **options):
+        with REDIS_COMMAND_SECONDS.time(str(args[0]).upper()):
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
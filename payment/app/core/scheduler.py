@@ -0,0 +1,180 @@
+"""Durable delayed-job scheduler for order completion"""
+import asyncio
+import time
+from typing import Iterable, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from payment.app.config import settings
+from payment.app.core.logging import setup_logging
+from payment.app.core.order_events import order_events, publish_status_changes
+from payment.app.core.outbox import OutboxRelay
+from payment.app.database import SessionLocal
+from payment.app.models.order import Order, OrderStatus
+from payment.app.repositories import order as order_repo
+from payment.app.repositories import outbox as outbox_repo
+
+logger = setup_logging("payment-scheduler")
+
+SCHEDULE_KEY = "scheduled:payment:order_completion"
+ORDER_COMPLETED_STREAM = "order_completed"
+SWEEP_PAGE_SIZE = 1000
+
+# Claim up to ARGV[2] jobs due at ARGV[1] by pushing their score out to the
+# lease expiry ARGV[3]. Jobs are removed only after they are handled, so a
+# worker that dies mid-batch leaves its jobs to be picked up again.
+CLAIM_SCRIPT = """
+local jobs = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, job in ipairs(jobs) do
+    redis.call('ZADD', KEYS[1], 'XX', ARGV[3], job)
+end
+return jobs
+"""
+
+
+def order_event(order: Order) -> dict:
+    """Build the order_completed stream payload for an order"""
+    return {
+        'pk': str(order.id),
+        'product_id': str(order.product_id),
+        'price': str(order.price),
+        'fee': str(order.fee),
+        'total': str(order.total),
+        'quantity': str(order.quantity),
+        'status': order.status.value
+    }
+
+
+def complete_orders(order_ids: List[int]) -> List[int]:
+    """Complete pending orders and queue their events in one transaction.
+
+    Returns the IDs of the orders that were completed.
+    """
+    db = SessionLocal()
+    try:
+        orders = order_repo.complete_orders(db, order_ids, commit=False)
+        outbox_repo.add_events(db, ORDER_COMPLETED_STREAM, [order_event(order) for order in orders])
+        db.commit()
+        return [order.id for order in orders]
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def pending_order_ids(limit: int, cursor: Optional[int]) -> List[int]:
+    db = SessionLocal()
+    try:
+        return order_repo.get_order_ids_by_status(db, OrderStatus.PENDING, limit, cursor)
+    finally:
+        db.close()
+
+
+class CompletionScheduler:
+    """Stores order completions in a Redis sorted set keyed by due time.
+
+    An asyncio worker claims due jobs in batches, completes the orders with
+    a single UPDATE and writes their order_completed events to the outbox in
+    the same transaction; the outbox relay, woken right after the commit,
+    publishes them, and the new statuses are pushed to every replica's order
+    cache. Pending completions survive restarts, and the worker holds no
+    thread while it waits.
+
+    If Redis was unreachable when an order was placed, its job was never
+    stored; a periodic sweep finds pending orders without a job and
+    schedules them again.
+    """
+
+    def __init__(self, redis_client, relay: Optional[OutboxRelay] = None):
+        self.redis = redis_client
+        self.relay = relay
+        self._claim = redis_client.register_script(CLAIM_SCRIPT)
+        self._next_sweep = 0.0
+        self._task = None
+
+    async def schedule(self, order_ids: Iterable[int], delay: float = None) -> None:
+        """Schedule completion of the given orders after delay seconds"""
+        due = time.time() + (settings.order_completion_delay if delay is None else delay)
+        await self.redis.zadd(SCHEDULE_KEY, {str(order_id): due for order_id in order_ids})
+
+    async def run_once(self) -> int:
+        """Handle one batch of due jobs. Returns the number of jobs claimed."""
+        now = time.time()
+        jobs = await self._claim(
+            keys=[SCHEDULE_KEY],
+            args=[now, settings.scheduler_batch_size, now + settings.scheduler_lease_seconds]
+        )
+        if not jobs:
+            return 0
+
+        completed = await run_in_threadpool(complete_orders, [int(job) for job in jobs])
+        if completed and self.relay is not None:
+            self.relay.notify()
+        changes = [(order_id, OrderStatus.COMPLETED.value) for order_id in completed]
+        # Local cache and waiters first; other replicas hear it from Redis
+        order_events.dispatch(changes)
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrem(SCHEDULE_KEY, *jobs)
+        publish_status_changes(pipe, changes)
+        await pipe.execute()
+
+        logger.info(f"Completed {len(completed)} orders ({len(jobs)} jobs claimed)")
+        return len(jobs)
+
+    async def sweep(self) -> int:
+        """Schedule pending orders that have no job. Returns how many were added.
+
+        They are given the full completion delay from now, so an order whose
+        own schedule() call is still in flight is never completed early; NX
+        leaves existing jobs alone.
+        """
+        rescheduled = 0
+        cursor = None
+        while True:
+            order_ids = await run_in_threadpool(pending_order_ids, SWEEP_PAGE_SIZE, cursor)
+            if not order_ids:
+                break
+            scores = await self.redis.zmscore(SCHEDULE_KEY, [str(order_id) for order_id in order_ids])
+            missing = [order_id for order_id, score in zip(order_ids, scores) if score is None]
+            if missing:
+                due = time.time() + settings.order_completion_delay
+                rescheduled += await self.redis.zadd(SCHEDULE_KEY, {str(order_id): due for order_id in missing}, nx=True)
+            if len(order_ids) < SWEEP_PAGE_SIZE:
+                break
+            cursor = order_ids[-1]
+        return rescheduled
+
+    async def sweep_if_due(self) -> None:
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + settings.scheduler_sweep_interval
+        rescheduled = await self.sweep()
+        if rescheduled:
+            logger.warning(f"Rescheduled {rescheduled} pending orders that had no completion job")
+
+    async def run(self) -> None:
+        """Worker loop; drains back-to-back while full batches are due"""
+        while True:
+            try:
+                claimed = await self.run_once()
+                await self.sweep_if_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scheduler error: {str(e)}", exc_info=True)
+                claimed = 0
+
+            if claimed < settings.scheduler_batch_size:
+                await asyncio.sleep(settings.scheduler_poll_interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
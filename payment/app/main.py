@@ -1,12 +1,19 @@
 """FastAPI application entry point"""
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from payment.app.config import settings
-import redis
-from payment.app.database import init_db
+from payment.app.database import close_db, db_pool_stats, init_db
 from payment.app.routers import orders_router
+from payment.app.clients.inventory import create_inventory_client
+from payment.app.core.order_cache import order_cache
+from payment.app.core.order_events import order_events
+from payment.app.core.outbox import OutboxRelay
+from payment.app.core.scheduler import CompletionScheduler
 from payment.app.core.logging import setup_logging
+from payment.app.core.redis_client import InstrumentedRedis
+from payment.app.core.metrics import CONTENT_TYPE, MetricsMiddleware, register_cache_metrics, registry
+from payment.app.auth.jwt import token_cache
 
 logger = setup_logging("payment-service")
 
@@ -20,7 +27,7 @@ async def lifespan(app: FastAPI):
     logger.info("Database initialized successfully")
     
     # Initialize Redis connection and store in app state
-    app.state.redis = redis.Redis(
+    app.state.redis = InstrumentedRedis(
         host=settings.redis_host,
         port=settings.redis_port,
         password=settings.redis_password,
@@ -31,20 +38,39 @@ async def lifespan(app: FastAPI):
     
     # Test connection
     try:
-        app.state.redis.ping()
+        await app.state.redis.ping()
         logger.info(f"Redis connection established at {settings.redis_host}:{settings.redis_port}")
     except Exception as e:
         logger.warning(f"Redis connection failed: {e}")
     
+    # One subscription to order status changes feeds the cache and SSE clients
+    order_events.start(app.state.redis)
+    
+    # Pooled HTTP client for inventory service calls
+    app.state.inventory_client = create_inventory_client()
+    
+    # Outbox relay publishes the events that order changes commit to the DB
+    app.state.outbox_relay = OutboxRelay(app.state.redis)
+    app.state.outbox_relay.start()
+    
+    # Delayed order completion worker
+    app.state.scheduler = CompletionScheduler(app.state.redis, app.state.outbox_relay)
+    app.state.scheduler.start()
+    
     yield
     
-    # Shutdown - close Redis connection
+    # Shutdown - stop workers, close HTTP client and Redis connection
     logger.info("Shutting down payment service...")
+    await app.state.scheduler.stop()
+    await app.state.outbox_relay.stop()
+    await order_events.stop()
+    await app.state.inventory_client.aclose()
     if hasattr(app.state, 'redis'):
         try:
-            app.state.redis.close()
+            await app.state.redis.aclose()
         except Exception as e:
             logger.error(f"Error closing Redis connection: {e}")
+    await close_db()
 
 
 app = FastAPI(
@@ -63,6 +89,16 @@ app.add_middleware(
     allow_headers=settings.cors_headers,
 )
 
+# Request metrics (added last so it is outermost and times the whole stack)
+app.add_middleware(MetricsMiddleware)
+
+# Export in-process cache counters on /metrics
+register_cache_metrics({"orders": order_cache.orders, "jwt": token_cache})
+registry.callback(
+    "order_event_listeners", "Clients streaming order status changes", "gauge",
+    (), lambda: [((), order_events.listener_count())]
+)
+
 # Include routers
 app.include_router(orders_router)
 
@@ -72,3 +108,14 @@ def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": settings.app_name}
 
+
+@app.get("/health/db")
+def database_pool_check():
+    """Connection pool occupancy and checkout wait times"""
+    return db_pool_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -1,5 +1,5 @@
 """Database models"""
 from payment.app.models.order import Order
+from payment.app.models.outbox import OutboxEvent
 
-__all__ = ["Order"]
-
+__all__ = ["Order", "OutboxEvent"]
@@ -1,5 +1,5 @@
 """Order model"""
-from sqlalchemy import Column, Integer, String, Float, Enum as SQLEnum
+from sqlalchemy import Column, Index, Integer, String, Float, Enum as SQLEnum
 import enum
 from payment.app.database import Base
 
@@ -15,12 +15,20 @@ class Order(Base):
     """Order database model"""
     
     __tablename__ = "orders"
+    __table_args__ = (
+        # Keyset pages filtered by status or product walk these in ID order
+        Index("ix_orders_status_id", "status", "id"),
+        Index("ix_orders_product_id_id", "product_id", "id"),
+        # A user's order history is a range scan of this index
+        Index("ix_orders_user_id_id", "user_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, nullable=True)  # token sub of the buyer; null for orders placed before it was recorded
+    product_id = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)
     fee = Column(Float, nullable=False)
     total = Column(Float, nullable=False)
     quantity = Column(Integer, nullable=False)
-    status = Column(SQLEnum(OrderStatus), nullable=False, default=OrderStatus.PENDING, index=True)
+    status = Column(SQLEnum(OrderStatus), nullable=False, default=OrderStatus.PENDING)
 
@@ -0,0 +1,24 @@
+"""Outbox model"""
+import time
+from sqlalchemy import Column, Float, Index, Integer, JSON, String
+from payment.app.database import Base
+
+
+class OutboxEvent(Base):
+    """Stream event written in the same transaction as the change it announces.
+
+    The outbox relay publishes unpublished rows to Redis and stamps
+    published_at; nothing on the request path talks to Redis for them.
+    """
+    
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # The relay's scan: unpublished rows in insertion order
+        Index("ix_outbox_events_published_at_id", "published_at", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    stream = Column(String(100), nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(Float, nullable=False, default=time.time)  # unix seconds
+    published_at = Column(Float, nullable=True)
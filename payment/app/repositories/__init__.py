@@ -1,5 +1,4 @@
 """Repository layer for database operations"""
-from payment.app.repositories import order
-
-__all__ = ["order"]
+from payment.app.repositories import order, outbox
 
+__all__ = ["order", "outbox"]
@@ -1,6 +1,7 @@
 """Order repository for database operations"""
+from sqlalchemy import insert, update
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
 from payment.app.models.order import Order, OrderStatus
 
 
@@ -9,6 +10,56 @@ def get_order_by_id(db: Session, order_id: int) -> Optional[Order]:
     return db.query(Order).filter(Order.id == order_id).first()
 
 
+def get_orders_page(
+    db: Session,
+    limit: int,
+    cursor: Optional[int] = None,
+    status: Optional[OrderStatus] = None,
+    product_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    min_id: Optional[int] = None,
+    max_id: Optional[int] = None
+) -> List[Order]:
+    """Get one page of orders ordered by ID using keyset pagination.
+
+    With a status or product filter the (status, id) or (product_id, id)
+    index serves the page directly, so its cost does not grow with the table.
+    """
+    query = db.query(Order)
+    if status is not None:
+        query = query.filter(Order.status == status)
+    if product_id is not None:
+        query = query.filter(Order.product_id == product_id)
+    if user_id is not None:
+        query = query.filter(Order.user_id == user_id)
+    if cursor is not None:
+        query = query.filter(Order.id > cursor)
+    if min_id is not None:
+        query = query.filter(Order.id >= min_id)
+    if max_id is not None:
+        query = query.filter(Order.id <= max_id)
+    return query.order_by(Order.id).limit(limit).all()
+
+
+def get_order_ids_by_status(db: Session, status: OrderStatus, limit: int, cursor: Optional[int] = None) -> List[int]:
+    """Get one page of order IDs with the given status, in ID order"""
+    query = db.query(Order.id).filter(Order.status == status)
+    if cursor is not None:
+        query = query.filter(Order.id > cursor)
+    return [order_id for order_id, in query.order_by(Order.id).limit(limit)]
+
+
+def get_user_orders_page(db: Session, user_id: int, limit: int, cursor: Optional[int] = None) -> List[Order]:
+    """Get one page of a user's orders, newest first, using keyset pagination.
+
+    Served by the (user_id, id) index read backwards from the cursor.
+    """
+    query = db.query(Order).filter(Order.user_id == user_id)
+    if cursor is not None:
+        query = query.filter(Order.id < cursor)
+    return query.order_by(Order.id.desc()).limit(limit).all()
+
+
 def create_order(
     db: Session,
     product_id: int,
@@ -16,10 +67,12 @@ def create_order(
     fee: float,
     total: float,
     quantity: int,
-    status: OrderStatus = OrderStatus.PENDING
+    status: OrderStatus = OrderStatus.PENDING,
+    user_id: Optional[int] = None
 ) -> Order:
     """Create a new order"""
     order = Order(
+        user_id=user_id,
         product_id=product_id,
         price=price,
         fee=fee,
@@ -33,6 +86,15 @@ def create_order(
     return order
 
 
+def create_orders(db: Session, orders_data: List[dict], commit: bool = True) -> List[Order]:
+    """Create many orders with a single executemany, returned in input order"""
+    stmt = insert(Order).returning(Order, sort_by_parameter_order=True)
+    orders = list(db.scalars(stmt, orders_data))
+    if commit:
+        db.commit()
+    return orders
+
+
 def update_order_status(db: Session, order_id: int, status: OrderStatus) -> Optional[Order]:
     """Update order status"""
     order = get_order_by_id(db, order_id)
@@ -44,3 +106,23 @@ def update_order_status(db: Session, order_id: int, status: OrderStatus) -> Opti
     db.refresh(order)
     return order
 
+
+def complete_orders(db: Session, order_ids: List[int], commit: bool = True) -> List[Order]:
+    """Mark pending orders as completed in one statement.
+
+    Returns only the orders that were still pending, so replaying a batch
+    never completes an order twice.
+    """
+    if not order_ids:
+        return []
+    stmt = (
+        update(Order)
+        .where(Order.id.in_(order_ids), Order.status == OrderStatus.PENDING)
+        .values(status=OrderStatus.COMPLETED)
+        .returning(Order)
+        .execution_options(synchronize_session=False)
+    )
+    orders = list(db.scalars(stmt))
+    if commit:
+        db.commit()
+    return orders
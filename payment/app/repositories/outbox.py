@@ -0,0 +1,49 @@
+"""Outbox repository for database operations"""
+import time
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+from typing import List
+from payment.app.models.outbox import OutboxEvent
+
+
+def add_events(db: Session, stream: str, payloads: List[dict]) -> None:
+    """Queue events for a stream in the caller's transaction (no commit)"""
+    if not payloads:
+        return
+    now = time.time()
+    db.execute(insert(OutboxEvent), [{"stream": stream, "payload": payload, "created_at": now} for payload in payloads])
+
+
+def get_unpublished(db: Session, limit: int) -> List[OutboxEvent]:
+    """Oldest events not yet published"""
+    stmt = (
+        select(OutboxEvent)
+        .where(OutboxEvent.published_at.is_(None))
+        .order_by(OutboxEvent.id)
+        .limit(limit)
+    )
+    return list(db.scalars(stmt))
+
+
+def mark_published(db: Session, event_ids: List[int]) -> None:
+    """Stamp events as published with a single UPDATE"""
+    if not event_ids:
+        return
+    db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id.in_(event_ids))
+        .values(published_at=time.time())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def purge_published(db: Session, before: float) -> int:
+    """Delete events published before the given unix time"""
+    result = db.execute(
+        delete(OutboxEvent)
+        .where(OutboxEvent.published_at.is_not(None), OutboxEvent.published_at < before)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
@@ -1,121 +1,255 @@
 """Order API routes"""
-from typing import Annotated
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, status, Request
-from sqlalchemy.orm import Session
-import requests
+import asyncio
+import json
 import time
-from payment.app.schemas.order import OrderCreate, OrderResponse
-from payment.app.database import get_db, SessionLocal
+from typing import Annotated, AsyncIterator, List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, status, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from payment.app.schemas.order import OrderCreate, OrderBatchCreate, OrderResponse
+from payment.app.database import AnySession, get_db, run_db, run_db_new_session
 from payment.app.repositories import order as order_repo
 from payment.app.models.order import OrderStatus
 from payment.app.config import settings
-from payment.app.auth.oauth2 import user_required
+from payment.app.auth.oauth2 import admin_required, current_user_id
+from payment.app.clients import inventory as inventory_client
+from payment.app.core.logging import setup_logging
+from payment.app.core.order_cache import CachedOrder, etag_matches, order_cache
+from payment.app.core.order_events import order_events
+
+logger = setup_logging("payment-service")
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+# No further changes can follow these statuses, so their streams end
+FINAL_STATUSES = {OrderStatus.REFUNDED.value}
 
-def order_completed(order_id: int, order_data: dict) -> None:
-    """Background task to complete order after delay"""
-    # Lazy import to avoid circular import issues
-    from payment.app.main import app
-    
-    time.sleep(settings.order_completion_delay)
-    
-    # Update order status in database
-    db = SessionLocal()
-    try:
-        order = order_repo.update_order_status(db, order_id, OrderStatus.COMPLETED)
-        
-        if order:
-            # Update order_data with latest values from database
-            order_data['status'] = OrderStatus.COMPLETED.value
-            order_data['pk'] = str(order.id)
-            order_data['product_id'] = str(order.product_id)
-            order_data['quantity'] = str(order.quantity)
-            
-            # Send to Redis stream for inventory service using global connection
-            redis_client = app.state.redis
-            redis_client.xadd('order_completed', order_data, '*')
-    finally:
-        db.close()
-
-
-@router.get("/{order_id}", response_model=OrderResponse, dependencies=[Depends(user_required)])
-def get_order(
-    order_id: int,
-    db: Annotated[Session, Depends(get_db)]
-):
-    """Get an order by ID"""
-    order = order_repo.get_order_by_id(db, order_id)
-    if not order:
+
+def price_order(product: dict) -> dict:
+    """Calculate order amounts from an inventory product"""
+    price = float(product['price'])
+    return {'price': price, 'fee': 0.2 * price, 'total': 1.2 * price}
+
+
+def insert_orders(db: Session, orders_data: List[dict]) -> List[OrderResponse]:
+    """Insert orders in one transaction and serialize them before the commit expires them"""
+    orders = order_repo.create_orders(db, orders_data, commit=False)
+    created = [OrderResponse.model_validate(order) for order in orders]
+    db.commit()
+    return created
+
+
+async def get_owned_order(db: AnySession, order_id: int, user_id: int) -> CachedOrder:
+    """Cached or loaded order, or a 404 if it belongs to another user"""
+    cached = order_cache.get(order_id) or await run_db(db, order_cache.load, order_id)
+    # Orders from before ownership was recorded have no owner to check against
+    if cached is None or cached.order.user_id not in (None, user_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Order not found"
         )
-    return order
+    return cached
+
+
+async def schedule_completion(request: Request, order_ids: List[int]) -> None:
+    """Schedule durable completion.
+
+    If Redis is down the orders stay pending until the scheduler's sweep
+    finds them without a job and schedules them.
+    """
+    try:
+        await request.app.state.scheduler.schedule(order_ids)
+    except Exception as e:
+        logger.error(f"Failed to schedule completion for orders {order_ids}: {str(e)}")
+
+
+@router.get("", response_model=List[OrderResponse], dependencies=[Depends(admin_required)])
+async def list_orders(
+    response: Response,
+    db: Annotated[AnySession, Depends(get_db)],
+    cursor: Annotated[Optional[int], Query(description="Return orders with an ID greater than this")] = None,
+    limit: Annotated[int, Query(ge=1, le=settings.orders_max_page_size)] = settings.orders_page_size,
+    order_status: Annotated[Optional[OrderStatus], Query(alias="status")] = None,
+    product_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    min_id: Annotated[Optional[int], Query(description="Smallest order ID to include")] = None,
+    max_id: Annotated[Optional[int], Query(description="Largest order ID to include")] = None
+):
+    """Get a page of orders ordered by ID, optionally filtered.
+
+    When the page is full, the X-Next-Cursor header holds the cursor for the next page.
+    """
+    orders = await run_db(
+        db,
+        order_repo.get_orders_page,
+        limit,
+        cursor,
+        status=order_status,
+        product_id=product_id,
+        user_id=user_id,
+        min_id=min_id,
+        max_id=max_id
+    )
+    if len(orders) == limit:
+        response.headers["X-Next-Cursor"] = str(orders[-1].id)
+    return orders
+
+
+@router.get("/mine", response_model=List[OrderResponse])
+async def list_my_orders(
+    response: Response,
+    db: Annotated[AnySession, Depends(get_db)],
+    user_id: Annotated[int, Depends(current_user_id)],
+    cursor: Annotated[Optional[int], Query(description="Return orders with an ID less than this")] = None,
+    limit: Annotated[int, Query(ge=1, le=settings.orders_max_page_size)] = settings.orders_page_size
+):
+    """Get a page of the caller's orders, newest first.
+
+    When the page is full, the X-Next-Cursor header holds the cursor for the next page.
+    """
+    orders = await run_db(db, order_repo.get_user_orders_page, user_id, limit, cursor)
+    if len(orders) == limit:
+        response.headers["X-Next-Cursor"] = str(orders[-1].id)
+    return orders
+
+
+@router.get(
+    "/{order_id}",
+    response_model=OrderResponse,
+    responses={304: {"description": "Order unchanged since the ETag in If-None-Match"}}
+)
+async def get_order(
+    order_id: int,
+    request: Request,
+    db: Annotated[AnySession, Depends(get_db)],
+    user_id: Annotated[int, Depends(current_user_id)]
+):
+    """Get an order by ID.
+
+    Served from the order cache when possible, with a weak ETag so pollers
+    can send If-None-Match and get a bodyless 304 until the status changes.
+    """
+    cached = await get_owned_order(db, order_id, user_id)
+    # Clients must revalidate, so a status change is never hidden by a cache
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
+
+
+def status_event(order_id: int, order_status: str) -> str:
+    """One SSE message; the id lets a reconnecting client resume from it"""
+    data = json.dumps({"id": order_id, "status": order_status})
+    return f"id: {order_id}-{order_status}\nevent: status\ndata: {data}\n\n"
+
+
+async def stream_status(order_id: int, loaded_status: str) -> AsyncIterator[str]:
+    """Current status, then every change until a final status or the time limit"""
+    deadline = time.monotonic() + settings.order_events_max_seconds
+    with order_events.listen(order_id) as changes:
+        # Re-read after subscribing, so a change made since the route's read
+        # is not missed. The hub updates cached entries before waking
+        # listeners; on a miss (evicted, expired or caching disabled) go to the
+        # database, as the request's session is closed once streaming starts.
+        cached = order_cache.get(order_id) or await run_db_new_session(order_cache.load, order_id)
+        current = cached.order.status.value if cached is not None else loaded_status
+        yield status_event(order_id, current)
+        while current not in FINAL_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                changed = await asyncio.wait_for(changes.get(), min(settings.order_events_keepalive, remaining))
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                continue
+            if changed != current:
+                current = changed
+                yield status_event(order_id, current)
+
 
+@router.get(
+    "/{order_id}/events",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}, "description": "Server-Sent Events stream of status changes"}}
+)
+async def order_status_events(
+    order_id: int,
+    db: Annotated[AnySession, Depends(get_db)],
+    user_id: Annotated[int, Depends(current_user_id)]
+):
+    """Stream an order's status as Server-Sent Events.
+
+    Sends the current status at once and each change as it happens, then
+    closes after a final status (refunded) or ORDER_EVENTS_MAX_SECONDS.
+    """
+    cached = await get_owned_order(db, order_id, user_id)
+    return StreamingResponse(
+        stream_status(order_id, cached.order.status.value),
+        media_type="text/event-stream",
+        # Disable proxy buffering so events are delivered as they happen
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-@router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(user_required)])
-def create_order(
+
+@router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
+async def create_order(
     request: Request,
     order_data: OrderCreate,
-    background_tasks: BackgroundTasks,
-    db: Annotated[Session, Depends(get_db)]
+    db: Annotated[AnySession, Depends(get_db)],
+    user_id: Annotated[int, Depends(current_user_id)]
 ):
     """Create a new order"""
-    # Fetch product from inventory service
-    try:
-        auth_header = request.headers.get('Authorization')
-        response = requests.get(
-            f"{settings.inventory_service_url}/products/{order_data.id}",
-            headers={
-                "Authorization": auth_header
-            },
-            timeout=10.0
-        )
-        response.raise_for_status()
-        product = response.json()
-    except requests.exceptions.HTTPError as e:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Product not found: {e.response.status_code}"
-        )
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Inventory service unavailable: {str(e)}"
-        )
-    
-    # Calculate order details
-    price = float(product['price'])
-    fee = 0.2 * price
-    total = 1.2 * price
+    # Fetch product from inventory service over the shared connection pool
+    product = await inventory_client.fetch_product(
+        request.app.state.inventory_client,
+        order_data.id,
+        request.headers.get('Authorization')
+    )
     
-    # Create order
-    order = order_repo.create_order(
-        db=db,
+    # Create order (DB work stays off the event loop)
+    order = await run_db(
+        db,
+        order_repo.create_order,
         product_id=order_data.id,
-        price=price,
-        fee=fee,
-        total=total,
         quantity=order_data.quantity,
-        status=OrderStatus.PENDING
+        status=OrderStatus.PENDING,
+        user_id=user_id,
+        **price_order(product)
     )
     
-    # Prepare order data for background task and Redis
-    order_dict = {
-        'pk': str(order.id),
-        'product_id': str(order.product_id),
-        'price': str(order.price),
-        'fee': str(order.fee),
-        'total': str(order.total),
-        'quantity': str(order.quantity),
-        'status': order.status.value
-    }
-    
-    # Schedule background task to complete order
-    # Use imported app instance directly (no need to pass request)
-    background_tasks.add_task(order_completed, order.id, order_dict)
+    await schedule_completion(request, [order.id])
     
     return order
 
+
+@router.post("/batch", response_model=List[OrderResponse], status_code=status.HTTP_201_CREATED)
+async def create_orders(
+    request: Request,
+    batch_data: OrderBatchCreate,
+    db: Annotated[AnySession, Depends(get_db)],
+    user_id: Annotated[int, Depends(current_user_id)]
+):
+    """Place several orders with one inventory lookup and one commit"""
+    products = await inventory_client.fetch_products(
+        request.app.state.inventory_client,
+        [item.id for item in batch_data.items],
+        request.headers.get('Authorization')
+    )
+    
+    orders_data = [
+        {
+            'product_id': item.id,
+            'quantity': item.quantity,
+            'status': OrderStatus.PENDING,
+            'user_id': user_id,
+            **price_order(products[item.id])
+        }
+        for item in batch_data.items
+    ]
+    orders = await run_db(db, insert_orders, orders_data)
+    
+    await schedule_completion(request, [order.id for order in orders])
+    
+    return orders
@@ -1,5 +1,5 @@
 """Pydantic schemas"""
-from payment.app.schemas.order import OrderCreate, OrderResponse
+from payment.app.schemas.order import OrderCreate, OrderBatchCreate, OrderResponse
 
-__all__ = ["OrderCreate", "OrderResponse"]
+__all__ = ["OrderCreate", "OrderBatchCreate", "OrderResponse"]
 
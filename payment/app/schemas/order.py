@@ -1,5 +1,7 @@
 """Order Pydantic schemas"""
 from pydantic import BaseModel, Field
+from typing import List, Optional
+from payment.app.config import settings
 from payment.app.models.order import OrderStatus
 
 
@@ -9,9 +11,15 @@ class OrderCreate(BaseModel):
     quantity: int = Field(..., gt=0, description="Quantity to order")
 
 
+class OrderBatchCreate(BaseModel):
+    """Schema for placing several orders in one request"""
+    items: List[OrderCreate] = Field(..., min_length=1, max_length=settings.order_batch_max_items)
+
+
 class OrderResponse(BaseModel):
     """Schema for order response"""
     id: int
+    user_id: Optional[int] = None
     product_id: int
     price: float
     fee: float
@@ -1,25 +1,48 @@
 """Consumer service for processing refund order events"""
+import asyncio
+import functools
 import time
-import socket
 import redis
+import redis.asyncio
 from payment.app.database import SessionLocal, init_db
 from payment.app.repositories import order as order_repo
 from payment.app.models.order import OrderStatus
 from payment.app.config import settings
 from payment.app.core.logging import setup_logging
+from payment.app.core.metrics import registry
+from payment.app.core.consumer_metrics import MESSAGES, record_batch, watch_stream
+from payment.app.core.runner import run_workers
+from payment.app.core.async_consumer import AsyncStreamConsumer, stop_when_set
+from payment.app.core.dedupe import DedupeStore
+from payment.app.core.order_events import publish_status_changes
+from payment.app.core.streams import PendingReclaimer, record_failure
 
 logger = setup_logging("payment-consumer")
 IDEMPOTENCY_KEY = "processed:payment:refund"
+dedupe = DedupeStore(
+    IDEMPOTENCY_KEY,
+    settings.dedupe_mode,
+    retention=settings.dedupe_retention_seconds,
+    bucket_seconds=settings.dedupe_bucket_seconds,
+    bloom_capacity=settings.dedupe_bloom_capacity,
+    bloom_error_rate=settings.dedupe_bloom_error_rate
+)
+
+REFUNDS = registry.counter(
+    "consumer_refunds_total",
+    "Orders marked refunded from refund_order events"
+)
 
 
 def process_refund(redis_client, order_data: dict, message_id: str, key: str, group: str) -> bool:
     # Idempotency check
-    if redis_client.sismember(IDEMPOTENCY_KEY, message_id):
+    if dedupe.seen(redis_client, [message_id])[0]:
         logger.info(
             "Skipping already processed message",
             extra={"message_id": message_id}
         )
         redis_client.xack(key, group, message_id)
+        MESSAGES.inc(key, "skipped")
         return True
     
     """Process a single refund event. Returns True if successful."""
@@ -33,99 +56,283 @@ def process_refund(redis_client, order_data: dict, message_id: str, key: str, gr
         if not order:
             logger.warning(f"Order {order_id} not found for refund")
             # Acknowledge message even if order not found
-            redis_client.sadd(IDEMPOTENCY_KEY, message_id)
+            dedupe.mark(redis_client, [message_id])
             redis_client.xack(key, group, message_id)
+            MESSAGES.inc(key, "not_found")
             return False
         else:
             logger.info(f"Order {order_id} refunded successfully")
+            # Let API replicas update their cached copy of the order
+            publish_status_changes(redis_client, [(order_id, OrderStatus.REFUNDED.value)])
             # Acknowledge successful processing
-            redis_client.sadd(IDEMPOTENCY_KEY, message_id)
+            dedupe.mark(redis_client, [message_id])
             redis_client.xack(key, group, message_id)
+            REFUNDS.inc()
+            MESSAGES.inc(key, "processed")
             return True
             
     except Exception as e:
         logger.error(f"Error processing refund for order {order_data.get('pk', 'unknown')}: {str(e)}", exc_info=True)
         # Rollback database transaction
         db.rollback()
-        # Acknowledge message to prevent infinite reprocessing
-        redis_client.xack(key, group, message_id)
+        # Leave the message pending: the reclaimer retries it and, after
+        # CONSUMER_MAX_DELIVERIES attempts, moves it to the dead-letter stream
+        record_failure(redis_client, key, message_id, e)
+        MESSAGES.inc(key, "failed")
         return False
     finally:
         db.close()
 
 
-def consume_refunds() -> None:
-    """Main consumer loop for processing refund events"""
-    logger.info("Starting payment consumer service")
-    
-    # Initialize database tables before starting consumer
-    logger.info("Initializing database...")
-    init_db()
-    logger.info("Database initialized successfully")
-    
-    # Reuse Redis connection
-    redis_client = redis.Redis(
+def handle_messages(redis_client, messages: list, key: str, group: str) -> None:
+    """Process a batch read from the stream and record its timings"""
+    start = time.perf_counter()
+    for message_id, order_data in messages:
+        process_refund(redis_client, order_data, message_id, key, group)
+    record_batch(key, len(messages), time.perf_counter() - start)
+
+
+def apply_refunds(pending: list) -> dict:
+    """Mark the orders of a batch refunded, one transaction per order.
+
+    Returns {message_id: outcome}, where outcome is True when the order was
+    refunded, False when it does not exist, or the exception that failed it.
+    """
+    outcomes = {}
+    db = SessionLocal()
+    try:
+        for message_id, order_data in pending:
+            try:
+                order = order_repo.update_order_status(db, int(order_data['pk']), OrderStatus.REFUNDED)
+                outcomes[message_id] = order is not None
+            except Exception as e:
+                logger.error(f"Error processing refund for order {order_data.get('pk', 'unknown')}: {str(e)}", exc_info=True)
+                db.rollback()
+                outcomes[message_id] = e
+    finally:
+        db.close()
+    return outcomes
+
+
+async def handle_messages_async(redis_client, messages: list, key: str, group: str) -> list:
+    """Batch handler for the asyncio engine; returns the message IDs to ack.
+
+    Idempotency lookups, idempotency marks and failure records each take one
+    round trip per batch, and the DB work runs on a worker thread. Failed
+    messages are not returned, so they stay pending for the reclaimer.
+    """
+    message_ids = [message_id for message_id, _ in messages]
+    processed = await dedupe.seen_async(redis_client, message_ids)
+    pending = [message for message, seen in zip(messages, processed) if not seen]
+    skipped_ids = [message_id for (message_id, _), seen in zip(messages, processed) if seen]
+    if skipped_ids:
+        logger.info(f"Skipping {len(skipped_ids)} already processed messages")
+        MESSAGES.inc(key, "skipped", amount=len(skipped_ids))
+
+    outcomes = await asyncio.to_thread(apply_refunds, pending)
+    done_ids = [message_id for message_id, outcome in outcomes.items() if isinstance(outcome, bool)]
+    pipe = redis_client.pipeline(transaction=False)
+    dedupe.mark(pipe, done_ids)
+    publish_status_changes(pipe, [
+        (int(order_data['pk']), OrderStatus.REFUNDED.value)
+        for message_id, order_data in pending
+        if outcomes[message_id] is True
+    ])
+    for message_id, outcome in outcomes.items():
+        if not isinstance(outcome, bool):
+            record_failure(pipe, key, message_id, outcome)
+    if len(pipe):
+        await pipe.execute()
+
+    refunded = sum(1 for outcome in outcomes.values() if outcome is True)
+    REFUNDS.inc(amount=refunded)
+    MESSAGES.inc(key, "processed", amount=refunded)
+    MESSAGES.inc(key, "not_found", amount=sum(1 for outcome in outcomes.values() if outcome is False))
+    MESSAGES.inc(key, "failed", amount=len(outcomes) - len(done_ids))
+    logger.info(f"Processed batch of {len(pending)} refunds ({refunded} refunded)")
+    return skipped_ids + done_ids
+
+
+STREAM_KEY = 'refund_order'
+GROUP = 'payment-group'
+
+
+def create_redis_client() -> redis.Redis:
+    return redis.Redis(
         host=settings.redis_host,
         port=settings.redis_port,
         password=settings.redis_password,
         decode_responses=True
     )
-    
-    key = 'refund_order'
-    group = 'payment-group'
-    # Use hostname as consumer name for identification
-    consumer_name = socket.gethostname()
-    
-    try:
-        redis_client.xgroup_create(
-            name=key,
-            groupname=group,
-            id="0",
-            mkstream=True
-        )
-        logger.info(f"Created consumer group '{group}' for stream '{key}'")
-    except Exception:
-        logger.info(f"Consumer group '{group}' already exists")
-    
-    logger.info(f"Consumer '{consumer_name}' started for group '{group}' on stream '{key}'")
-    
-    # First, try to read any existing undelivered messages from the beginning
-    # This handles the case where messages existed before the consumer group was created
+
+
+def create_async_redis_client() -> redis.asyncio.Redis:
+    return redis.asyncio.Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        password=settings.redis_password,
+        decode_responses=True
+    )
+
+
+def create_reclaimer(redis_client, consumer_name: str) -> PendingReclaimer:
+    return PendingReclaimer(
+        redis_client,
+        STREAM_KEY,
+        GROUP,
+        consumer_name,
+        handle_messages,
+        min_idle_ms=settings.consumer_reclaim_min_idle_ms,
+        batch_size=settings.consumer_reclaim_batch_size,
+        interval=settings.consumer_reclaim_interval,
+        max_deliveries=settings.consumer_max_deliveries,
+        dlq_maxlen=settings.consumer_dlq_maxlen
+    )
+
+
+def recover_pending(redis_client, reclaimer: PendingReclaimer, consumer_name: str) -> None:
+    """Retry this consumer's own pending messages from a previous run.
+
+    They go through the reclaimer so a message that crashed us is dead-lettered
+    rather than retried forever; other consumers' entries are reclaimed later.
+    """
     try:
         initial_results = redis_client.xreadgroup(
-            groupname=group,
+            groupname=GROUP,
             consumername=consumer_name,
-            streams={key: "0"},
+            streams={STREAM_KEY: "0"},
             count=100
         )
         if initial_results:
             for stream, messages in initial_results:
                 logger.info(f"Found {len(messages)} existing undelivered messages to process")
-                for message_id, order_data in messages:
-                    process_refund(redis_client, order_data, message_id, key, group)
+                reclaimer.process(messages)
     except Exception as e:
         logger.error(f"Error reading initial messages: {str(e)}", exc_info=True)
 
+
+def consume_worker(consumer_name: str, stop_event) -> None:
+    """Consumer loop for one worker; returns once stop_event is set.
+
+    The event is only checked between batches, so a batch that has been
+    read is always processed and acked before the worker exits.
+    """
+    key = STREAM_KEY
+    group = GROUP
+    # Each worker has its own Redis connections; DB sessions come from this
+    # process's engine pool, one per message
+    redis_client = create_redis_client()
+    watch_stream(redis_client, key, group)
+    reclaimer = create_reclaimer(redis_client, consumer_name)
+    
+    logger.info(f"Consumer '{consumer_name}' started for group '{group}' on stream '{key}'")
+    recover_pending(redis_client, reclaimer, consumer_name)
+
     logger.info("Starting to consume messages from Redis stream")
-    while True:
+    while not stop_event.is_set():
         try:
             results = redis_client.xreadgroup(
                 groupname=group,
                 consumername=consumer_name,
                 streams={key: ">"},
-                count=10,
-                block=5000
+                count=settings.consumer_batch_size,
+                block=settings.consumer_block_ms
             )
             
             if results:
                 for stream, messages in results:
-                    for message_id, order_data in messages:
-                        process_refund(redis_client, order_data, message_id, key, group)
+                    handle_messages(redis_client, messages, key, group)
+            
+            # Between reads, take over entries abandoned by failed or dead consumers
+            reclaimer.run_if_due()
         
         except Exception as e:
             logger.error(f"Consumer error: {str(e)}", exc_info=True)
         
-        time.sleep(1)
+        stop_event.wait(1)
+
+    redis_client.close()
+    logger.info(f"Consumer '{consumer_name}' stopped")
+
+
+async def consume_async(consumer_name: str, stop_event) -> None:
+    """asyncio engine loop for one worker; returns once stop_event is set"""
+    key = STREAM_KEY
+    group = GROUP
+    # The sync client serves metrics scrapes and the reclaimer; the hot path
+    # uses the async one
+    redis_client = create_redis_client()
+    async_client = create_async_redis_client()
+    watch_stream(redis_client, key, group)
+    reclaimer = create_reclaimer(redis_client, consumer_name)
+
+    logger.info(f"Async consumer '{consumer_name}' started for group '{group}' on stream '{key}'")
+    await asyncio.to_thread(recover_pending, redis_client, reclaimer, consumer_name)
+
+    engine = AsyncStreamConsumer(
+        async_client,
+        key,
+        group,
+        consumer_name,
+        functools.partial(handle_messages_async, key=key, group=group),
+        batch_size=settings.consumer_batch_size,
+        block_ms=settings.consumer_block_ms,
+        concurrency=settings.consumer_concurrency,
+        reclaimer=reclaimer
+    )
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(stop_when_set(stop_event, stop))
+    try:
+        await engine.run(stop)
+    finally:
+        watcher.cancel()
+        await async_client.aclose()
+        redis_client.close()
+    logger.info(f"Consumer '{consumer_name}' stopped")
+
+
+def consume_worker_async(consumer_name: str, stop_event) -> None:
+    """Runner entry point for the asyncio engine"""
+    asyncio.run(consume_async(consumer_name, stop_event))
+
+
+CONSUMER_ENGINES = {"sync": consume_worker, "asyncio": consume_worker_async}
+
+
+def consume_refunds() -> None:
+    """Prepare the stream and run CONSUMER_WORKERS consumer workers"""
+    logger.info("Starting payment consumer service")
+    
+    # Initialize database tables before starting consumer
+    logger.info("Initializing database...")
+    init_db()
+    logger.info("Database initialized successfully")
+    
+    redis_client = create_redis_client()
+    try:
+        redis_client.xgroup_create(
+            name=STREAM_KEY,
+            groupname=GROUP,
+            id="0",
+            mkstream=True
+        )
+        logger.info(f"Created consumer group '{GROUP}' for stream '{STREAM_KEY}'")
+    except Exception:
+        logger.info(f"Consumer group '{GROUP}' already exists")
+    finally:
+        redis_client.close()
+    
+    if settings.consumer_engine not in CONSUMER_ENGINES:
+        raise ValueError(
+            f"Unknown consumer engine {settings.consumer_engine!r}, expected one of {tuple(CONSUMER_ENGINES)}"
+        )
+    run_workers(
+        CONSUMER_ENGINES[settings.consumer_engine],
+        settings.consumer_workers,
+        settings.consumer_worker_mode,
+        settings.consumer_shutdown_timeout,
+        settings.consumer_metrics_port
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,59 @@
+"""Per-thread metric shards are retired when their threads exit"""
+import importlib
+import threading
+
+import pytest
+
+SERVICES = ("inventory", "payment", "user")
+
+
+@pytest.fixture(params=SERVICES)
+def metrics(request):
+    return importlib.import_module(f"{request.param}.app.core.metrics")
+
+
+def run_threads(count: int, target) -> None:
+    # One at a time, as an idle threadpool replaces its workers
+    for _ in range(count):
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+
+
+def test_shards_stay_bounded_and_totals_survive_thread_exit(metrics):
+    registry = metrics.MetricsRegistry()
+    counter = registry.counter("test_events_total", "Events", ("kind",))
+    histogram = registry.histogram("test_seconds", "Timings", ("kind",), buckets=(0.1, 1.0))
+
+    def record():
+        counter.inc("a")
+        histogram.observe(0.5, "a")
+
+    run_threads(500, record)
+    counter.inc("a")
+
+    assert counter.shard_count() <= 2
+    assert histogram.shard_count() <= 2
+    rendered = registry.render()
+    assert 'test_events_total{kind="a"} 501' in rendered
+    assert 'test_seconds_count{kind="a"} 500' in rendered
+    assert 'test_seconds_bucket{kind="a",le="0.1"} 0' in rendered
+    assert 'test_seconds_bucket{kind="a",le="1.0"} 500' in rendered
+
+
+def test_concurrent_writers_are_not_lost(metrics):
+    counter = metrics.Counter("test_concurrent_total", "Events")
+    barrier = threading.Barrier(8)
+
+    def record():
+        barrier.wait()
+        for _ in range(10000):
+            counter.inc()
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.render() == ["test_concurrent_total 80000"]
@@ -1,10 +1,71 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
+from user.app.config import settings
 
-pwd_cxt = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_cxt = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=settings.argon2_time_cost,
+    argon2__memory_cost=settings.argon2_memory_cost,
+    argon2__parallelism=settings.argon2_parallelism
+)
 
 class Hash():
     def hash(password: str):
         return pwd_cxt.hash(password)
 
     def verify(hashed_password,plain_password):
-        return pwd_cxt.verify(plain_password,hashed_password)
\ No newline at end of file
+        return pwd_cxt.verify(plain_password,hashed_password)
+
+
+class HashingPool:
+    """Runs argon2 in worker processes so hashing never blocks the event loop.
+
+    At most max_pending calls may be queued or running; beyond that callers
+    get an immediate 503 with Retry-After instead of piling up.
+    """
+
+    def __init__(self, workers: Optional[int], max_pending: int):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is busy, please retry",
+                headers={"Retry-After": "1"}
+            )
+        # Only the event loop thread touches the counter, so no lock is needed
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(Hash.hash, password)
+
+    async def verify(self, hashed_password: str, plain_password: str) -> bool:
+        return await self._run(Hash.verify, hashed_password, plain_password)
+
+
+hashing_pool = HashingPool(settings.hashing_workers, settings.hashing_max_pending)
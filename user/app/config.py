@@ -14,6 +14,18 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = "sqlite:///./user.db"
+    database_async: bool = False
+    # 20 + 20 matches the AnyIO threadpool (40 threads) that sync routes run on
+    db_pool_size: int = 20
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0  # seconds
+    db_pool_recycle: int = 1800  # seconds, server databases only
+    db_pool_pre_ping: bool = True  # server databases only
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size: int = 268435456  # 256 MiB
     
     # CORS
     cors_origins: List[str] = ["http://localhost:3000"]
@@ -25,6 +37,13 @@ class Settings(BaseSettings):
     redis_port: int = 6379
     redis_password: Optional[str] = None
     
+    # Password hashing (argon2)
+    argon2_time_cost: int = 3
+    argon2_memory_cost: int = 65536  # KiB
+    argon2_parallelism: int = 4
+    hashing_workers: Optional[int] = None  # defaults to the CPU count
+    hashing_max_pending: int = 64
+    
     # Application
     app_name: str = "User Service"
     app_version: str = "1.0.0"
@@ -1,11 +1,13 @@
 """FastAPI application entry point"""
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from user.app.config import settings
-from user.app.database import init_db
+from user.app.database import close_db, db_pool_stats, init_db
 from user.app.routers import auth_router
 from user.app.core.logging import setup_logging
+from user.app.auth.hashing import hashing_pool
+from user.app.core.metrics import CONTENT_TYPE, MetricsMiddleware, registry
 
 logger = setup_logging("user-service")
 
@@ -17,9 +19,13 @@ async def lifespan(app: FastAPI):
     logger.info("Starting user service...")
     init_db()
     logger.info("Database initialized successfully")
+    hashing_pool.start()
+    logger.info(f"Password hashing pool started with {hashing_pool.workers} workers")
     yield
-    # Shutdown (if needed in future)
+    # Shutdown
     logger.info("Shutting down user service...")
+    hashing_pool.shutdown()
+    await close_db()
 
 
 app = FastAPI(
@@ -38,6 +44,9 @@ app.add_middleware(
     allow_headers=settings.cors_headers,
 )
 
+# Request metrics (added last so it is outermost and times the whole stack)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router)
 
@@ -47,3 +56,14 @@ def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": settings.app_name}
 
+
+@app.get("/health/db")
+def database_pool_check():
+    """Connection pool occupancy and checkout wait times"""
+    return db_pool_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -2,7 +2,6 @@
 from sqlalchemy.orm import Session
 from user.app.models.user import User
 from user.app.schemas import UserCreate
-from user.app.auth.hashing import Hash
 from typing import Optional
 
 def is_user_exists(db: Session, email: str) -> bool:
@@ -14,8 +13,8 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
     """Get user by email"""
     return db.query(User).filter(User.email == email).first()
 
-def create_user(db: Session, user: UserCreate) -> User:
-    hashed_password  = Hash.hash(user.password)
+def create_user(db: Session, user: UserCreate, hashed_password: str) -> User:
+    """Create a user with an already hashed password"""
     user = User(email=user.email, password=hashed_password, role=user.role)
     db.add(user)
     db.commit()